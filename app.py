@@ -1,14 +1,25 @@
+import uuid
+
 import streamlit as st
 import numpy as np
 import pandas as pd
 import pydeck as pdk
 from graphviz import Digraph
 import plotly.graph_objects as go
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.decomposition import TruncatedSVD
-from utils.pdf_reader import extract_text_from_pdf
-from utils.summarizer import summarize_text
-from utils.qa_engine import ask_question_from_doc, generate_logic_questions, evaluate_user_answer
+from utils import models, inference, metrics
+from utils.cache import get_cache, document_key, artifact_name
+from utils.pdf_reader import spool_document_from_pdf
+from utils.jobs import Job, FAILED
+from utils.library import get_library, ask_question_from_library
+from utils.sessions import get_session_store
+from utils.concepts import get_concept_model, CONCEPT_MODEL_VERSION
+from utils.knowledge_graph import (
+    build_knowledge_graph, split_windows, strongest_edges, level_of_detail, edge_segments, related_terms,
+    MAX_TERMS, MAX_RENDER_EDGES, MAX_RENDER_NODES, WINDOWS
+)
+from utils.segmenter import segment_document, SEGMENTATION_VERSION
+from utils.summarizer import stream_summary, SUMMARY_DECODING
+from utils.qa_engine import ask_question_from_doc, stream_logic_questions, parse_questions, evaluate_user_answers, build_sentence_index, build_passage_index
 
 st.set_page_config(
     page_title="NeuroScholar | Smart Assistant for Research Summarization",
@@ -128,136 +139,488 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def create_knowledge_graph(text):
-    """Create a 3D knowledge graph from document text"""
-    try:
-        vectorizer = TfidfVectorizer(max_features=50, stop_words='english')
-        X = vectorizer.fit_transform([text])
-        terms = vectorizer.get_feature_names_out()
+@st.cache_resource
+def get_model_registry():
+    """Share one model registry across sessions and script reloads"""
+    return models.ModelRegistry()
+
+
+@st.cache_resource
+def get_inference_server():
+    """Share one micro-batching inference server across sessions"""
+    return inference.InferenceServer()
+
+
+@st.cache_resource
+def get_metrics():
+    """Share one metrics collector across sessions"""
+    return metrics.Metrics(metrics.build_sinks())
+
+
+@st.cache_resource
+def get_document_library():
+    """Share one persistent document library across sessions"""
+    return get_library()
+
+
+@st.cache_resource
+def get_sessions():
+    """Share one memory-bounded store of session artifacts across sessions"""
+    return get_session_store()
 
-        if X.T.shape[1] >= 3:
-            svd = TruncatedSVD(n_components=3)
-            coords = svd.fit_transform(X.T)
+
+@st.cache_resource
+def get_concepts():
+    """Share one corpus concept model across sessions"""
+    return get_concept_model()
+
+
+models.registry = get_model_registry()
+inference.server = get_inference_server()
+metrics.metrics = get_metrics()
+
+
+def render_model_panel():
+    """Show each model's backend, load time and memory footprint"""
+    with st.sidebar.expander("Models", expanded=False):
+        st.dataframe(pd.DataFrame(models.model_stats()), hide_index=True)
+
+        if models.MODEL_ADMIN:
+            backends = {spec["backend"] for spec in models.registry.specs.values()}
+            current = next(iter(backends)) if len(backends) == 1 else None
+            backend = st.selectbox(
+                "Backend for all models",
+                models.BACKENDS,
+                index=models.BACKENDS.index(current) if current else None,
+                placeholder="Mixed",
+                help="Applies to every session on this server. "
+                     "int8 applies dynamic quantization; onnx exports the models to ONNX Runtime"
+            )
+            if backend is not None and backend != current:
+                for name in models.MODEL_SPECS:
+                    models.set_backend(name, backend)
+                st.rerun()
+        if inference.INFERENCE_SERVER and inference.server.stats():
+            st.caption("Inference batching")
+            st.dataframe(pd.DataFrame(inference.server.stats()), hide_index=True)
+
+        col1, col2 = st.columns(2)
+        if col1.button("Warm up", key="warm_up_models"):
+            with st.spinner("Loading models..."):
+                models.warm_up()
+            st.rerun()
+        if models.MODEL_ADMIN and col2.button("Unload", key="unload_models"):
+            models.unload()
+            st.rerun()
+
+
+def render_performance_panel():
+    """Show per-stage timings, input sizes and cache hit rates"""
+    with st.sidebar.expander("Performance", expanded=False):
+        summary = metrics.metrics.summary()
+        if not summary:
+            st.caption("No stages recorded yet.")
+            return
+
+        st.dataframe(pd.DataFrame(summary), hide_index=True)
+
+        counters = [
+            {"event": name, **dict(labels), "count": value}
+            for (name, labels), value in sorted(metrics.metrics.counters().items())
+        ]
+        if counters:
+            st.caption("Cache hits and misses")
+            st.dataframe(pd.DataFrame(counters), hide_index=True)
+
+        usage = get_sessions().usage()
+        if usage:
+            st.caption(f"Session memory: {sum(row['memory_mb'] for row in usage):.1f} MB resident")
+            st.dataframe(pd.DataFrame(usage), hide_index=True)
+
+        if st.button("Reset", key="reset_metrics"):
+            metrics.metrics.reset()
+            st.rerun()
+
+
+def render_library_panel():
+    """List library documents and add or remove the current one"""
+    library = get_document_library()
+    with st.sidebar.expander("Library", expanded=False):
+        stats = library.stats()
+        if stats:
+            st.dataframe(pd.DataFrame(stats).drop(columns="doc_key"), hide_index=True)
+            st.caption(f"{library.passage_count()} passages across {len(stats)} documents")
         else:
-            coords = np.random.rand(len(terms), 3)
-
-        nodes = pd.DataFrame({
-            'term': terms,
-            'x': coords[:, 0],
-            'y': coords[:, 1],
-            'z': coords[:, 2],
-            'size': np.asarray(X.sum(axis=0)).flatten() * 50,
-            'color_r': np.random.randint(50, 255, len(terms)),
-            'color_g': np.random.randint(50, 255, len(terms)),
-            'color_b': np.random.randint(50, 255, len(terms))
-        })
-
-        co_occurrence = (X.T * X)
-        edges = []
-        for i in range(len(terms)):
-            for j in range(i + 1, len(terms)):
-                if co_occurrence[i, j] > 0.1:
-                    edges.append({
-                        'source': i,
-                        'target': j,
-                        'value': co_occurrence[i, j] * 10
-                    })
-
-        return nodes, pd.DataFrame(edges)
+            st.caption("No documents in the library yet.")
+
+        doc_key = st.session_state.get("doc_key")
+        job = st.session_state.get("ingest_job")
+        if doc_key and doc_key not in library and st.button(
+            "Add current document", key="library_add", disabled=job is None or not job.ready("passages")
+        ):
+            try:
+                with st.spinner("Adding to library..."):
+                    library.add(
+                        doc_key,
+                        st.session_state.uploaded_file_name,
+                        session_artifact("passages"),
+                        session_artifact("page_offsets")
+                    )
+                st.rerun()
+            except ValueError as e:
+                st.error(str(e))
+
+        if stats:
+            names = {doc["doc_key"]: doc["document"] for doc in stats}
+            removed = st.selectbox("Remove document", list(names), format_func=names.get, key="library_remove")
+            if st.button("Remove", key="library_remove_button"):
+                library.remove(removed)
+                st.rerun()
+
+
+def timed_knowledge_graph(doc_key, text, max_terms=MAX_TERMS, window="sentence", segments=None):
+    """Fold the document into the corpus concept model, then build its knowledge graph"""
+    concepts = get_concepts()
+    with metrics.timed("concepts.fit", chars=len(text)) as sizes:
+        sizes["added"] = concepts.partial_fit(doc_key, split_windows(text, window, segments))
+        if sizes["added"]:
+            concepts.save()
+        sizes["corpus_docs"] = concepts.n_docs
+
+    with metrics.timed("graph.build", chars=len(text), max_terms=max_terms, window=window) as sizes:
+        nodes, edges = build_knowledge_graph(text, max_terms, window, segments=segments, concept_model=concepts)
+        sizes.update(terms=len(nodes), edges=len(edges))
+    return nodes, edges
+
+
+def create_knowledge_graph(doc_key, text, max_terms=MAX_TERMS, window="sentence", segments=None):
+    """Create a 3D knowledge graph from document text"""
+    try:
+        return timed_knowledge_graph(doc_key, text, max_terms, window, segments)
 
     except Exception as e:
         st.error(f"Error creating knowledge graph: {str(e)}")
         return None, None
 
 
-def render_knowledge_graph(nodes, edges):
-    """Render interactive knowledge graph visualization"""
-    if nodes is None or edges is None:
-        return
+def cached_knowledge_graph(doc_key, text=None, max_terms=MAX_TERMS, window="sentence", segments=None):
+    """Load concept graph artifacts from the document cache or build them"""
+    cache = get_cache()
+    name = graph_artifact_name(max_terms, window)
+    graph = cache.get(doc_key, name)
+    if graph is None:
+        if text is None:
+            text = cache.get(doc_key, "text.txt")
+            segments = cache.get_index(doc_key, segments_artifact_name())
+        graph = create_knowledge_graph(doc_key, text, max_terms, window, segments)
+        if graph[0] is not None:
+            cache.put(doc_key, name, graph)
+    return graph
 
-    with st.spinner("Rendering knowledge graph..."):
-        tab1, tab2 = st.tabs(["Mind Map", "Concept Map"])
 
-        with tab1:
+def cached_index(doc_key, kind, model_name, build):
+    """Load a document index from the cache or build and store it"""
+    cache = get_cache()
+    name = index_artifact_name(kind, model_name)
+    index = cache.get_index(doc_key, name)
+    if index is None:
+        index = cache.put_index(doc_key, name, build())
+    return index
+
+
+INGEST_STAGES = {
+    "extract": "Extracting text",
+    "segment": "Segmenting sentences",
+    "sentences": "Indexing sentences",
+    "passages": "Indexing passages",
+    "graph": "Building knowledge graph",
+    "summary": "Summarizing"
+}
+
+
+def summary_artifact_name(decoding):
+    return artifact_name("summary", models.model_tag("summarizer"), decoding) + ".json"
+
+
+def segments_artifact_name():
+    return artifact_name("segments", SEGMENTATION_VERSION)
+
+
+def index_artifact_name(kind, model_name):
+    return artifact_name(kind, models.model_tag(model_name), SEGMENTATION_VERSION)
+
+
+def graph_artifact_name(max_terms, window):
+    return artifact_name(
+        "knowledge_graph", max_terms, window, SEGMENTATION_VERSION, "concepts", CONCEPT_MODEL_VERSION
+    ) + ".pkl"
+
+
+def load_document(doc_key):
+    """Read a document's spilled text and segmentation back from the cache"""
+    cache = get_cache()
+    return cache.get(doc_key, "text.txt"), cache.get_index(doc_key, segments_artifact_name())
+
+
+def start_ingest_job(doc_key, data, file_type, max_terms=MAX_TERMS, window="sentence"):
+    """Spill the document to the cache, then index, graph and summarize it in the background"""
+    cache = get_cache()
+    job = Job(doc_key)
+
+    def extract():
+        nonlocal data
+        try:
+            if cache.has(doc_key, "text.txt"):
+                return cache.get(doc_key, "extract.json", {})
+
+            if file_type == "application/pdf":
+                page_offsets, total_pages = cache.spool(doc_key, "text.txt", lambda write: spool_document_from_pdf(
+                    data, write, progress=lambda done, total: job.report("extract", done / total)
+                ))
+                cache.put(doc_key, "pages.json", page_offsets)
+                return cache.put(doc_key, "extract.json", {"pages": len(page_offsets), "total_pages": total_pages})
+
+            cache.put(doc_key, "text.txt", str(data, "utf-8"))
+            return {}
+        finally:
+            data = None
+
+    def segment(extracted):
+        name = segments_artifact_name()
+        if cache.get_index(doc_key, name) is None:
+            cache.put_index(doc_key, name, segment_document(
+                cache.get(doc_key, "text.txt"), cache.get(doc_key, "pages.json")
+            ))
+        return name
+
+    def index(kind, build):
+        def stage(extracted, segments_name):
+            cached_index(doc_key, kind, "semantic", lambda: build(*load_document(doc_key)))
+            return index_artifact_name(kind, "semantic")
+        return stage
+
+    def graph(extracted, segments_name):
+        name = graph_artifact_name(max_terms, window)
+        if not cache.has(doc_key, name):
+            text, segments = load_document(doc_key)
+            cache.put(doc_key, name, timed_knowledge_graph(doc_key, text, max_terms, window, segments))
+        return name
+
+    def summarize(extracted, segments_name):
+        for decoding in SUMMARY_DECODING:
+            summary = cache.get(doc_key, summary_artifact_name(decoding))
+            if summary is not None:
+                return summary
+
+        text, segments = load_document(doc_key)
+        partial = ""
+        for piece in stream_summary(text, segments=segments):
+            partial += piece
+            job.report("summary", partial=partial)
+        return cache.put(doc_key, summary_artifact_name("greedy"), partial.strip())
+
+    job.add_stage("extract", extract)
+    job.add_stage("segment", segment, after=["extract"])
+    job.add_stage("sentences", index("sentences", build_sentence_index), after=["extract", "segment"])
+    job.add_stage("passages", index("passages", build_passage_index), after=["extract", "segment"])
+    job.add_stage("graph", graph, after=["extract", "segment"])
+    job.add_stage("summary", summarize, after=["extract", "segment"])
+    return job
+
+
+ARTIFACT_LOADERS = {
+    "text": lambda doc_key: get_cache().get(doc_key, "text.txt"),
+    "page_offsets": lambda doc_key: get_cache().get(doc_key, "pages.json"),
+    "segments": lambda doc_key: get_cache().get_index(doc_key, segments_artifact_name()),
+    "sentences": lambda doc_key: get_cache().get_index(doc_key, index_artifact_name("sentences", "semantic")),
+    "passages": lambda doc_key: get_cache().get_index(doc_key, index_artifact_name("passages", "semantic")),
+}
+
+
+OPTIONAL_ARTIFACTS = {"page_offsets"}
+
+
+def restart_ingest():
+    """Ingest the current upload again after its cached artifacts were evicted"""
+    st.session_state.doc_key = None
+    st.rerun()
+
+
+def session_artifact(name):
+    """Load an artifact of the current document within this session's memory budget"""
+    doc_key = st.session_state.doc_key
+    value = get_sessions().get(
+        st.session_state.session_id, (doc_key, name), lambda: ARTIFACT_LOADERS[name](doc_key)
+    )
+    if value is None and name not in OPTIONAL_ARTIFACTS:
+        restart_ingest()
+    return value
+
+
+@st.fragment(run_every=1.0)
+def render_ingest_progress(job):
+    """Poll background ingest stages and rerun the page when one settles"""
+    for stage in job.snapshot():
+        label = INGEST_STAGES[stage["name"]]
+        if stage["status"] == FAILED:
+            st.progress(stage["progress"], text=f"{label}: failed")
+        else:
+            st.progress(stage["progress"], text=f"{label}: {stage['status']}")
 
-            if not nodes.empty:
-                root_term = nodes.loc[nodes['size'].idxmax(), 'term']
-                child_terms = nodes[nodes['term'] != root_term].sort_values(by='size', ascending=False).head(5)['term']
+    settled = job.settled()
+    if settled != st.session_state.get("ingest_settled"):
+        st.session_state.ingest_settled = settled
+        st.rerun()
 
-                dot = Digraph()
 
-                dot.node(root_term, root_term, shape='ellipse', style='filled', color='lightblue')
+@st.fragment(run_every=0.5)
+def render_summary_preview(job):
+    """Show the summary as it streams in from the background job"""
+    partial = job.stages["summary"]["partial"]
+    if partial:
+        st.markdown(partial)
+    else:
+        st.caption("Generating intelligent summary...")
+
+
+def build_mind_map(nodes, edges):
+    """Build a Graphviz mind map around the most prominent term"""
+    root_id = int(nodes['size'].to_numpy().argmax())
+    root_term = nodes['term'].iloc[root_id]
+    children = nodes[nodes['term'] != root_term].sort_values(by='size', ascending=False, kind='stable').head(5)
+
+    dot = Digraph()
+
+    dot.node(root_term, root_term, shape='ellipse', style='filled', color='lightblue')
+
+    for child in children['term']:
+        dot.node(child, child)
+        dot.edge(root_term, child)
+
+    for child_id, child in zip(children.index, children['term']):
+        for grandchild in related_terms(nodes, edges, int(child_id)):
+            dot.node(grandchild, grandchild)
+            dot.edge(child, grandchild)
+
+    return dot
+
+
+def build_concept_figure(nodes, edges, max_edges=MAX_RENDER_EDGES, max_nodes=MAX_RENDER_NODES):
+    """Build the 3D concept map with all edges in a single line trace"""
+    nodes, edges = level_of_detail(nodes, edges, max_nodes)
+    edges = strongest_edges(edges, max_edges)
+
+    fig = go.Figure()
+
+    segments = edge_segments(nodes, edges)
+    fig.add_trace(go.Scatter3d(
+        x=segments[:, 0],
+        y=segments[:, 1],
+        z=segments[:, 2],
+        mode='lines',
+        line=dict(
+            color=np.repeat(edges['value'].to_numpy(), 3),
+            colorscale=[[0, 'rgba(200,200,200,0.3)'], [1, 'rgba(110,110,110,0.8)']],
+            width=3
+        ),
+        hoverinfo='none',
+        showlegend=False
+    ))
+
+    # Add nodes
+    fig.add_trace(go.Scatter3d(
+        x=nodes['x'],
+        y=nodes['y'],
+        z=nodes['z'],
+        mode='markers+text',
+        marker=dict(
+            size=nodes['size'] / 10,
+            color=[f'rgb({r},{g},{b})' for r, g, b in zip(nodes['color_r'], nodes['color_g'], nodes['color_b'])],
+            opacity=0.8,
+            line=dict(width=2, color='DarkSlateGrey')
+        ),
+        text=nodes['term'],
+        textposition="middle center",
+        hoverinfo='text',
+        hovertext=nodes['term'],
+        showlegend=False
+    ))
+
+    fig.update_layout(
+        scene=dict(
+            xaxis=dict(visible=False),
+            yaxis=dict(visible=False),
+            zaxis=dict(visible=False),
+            bgcolor="rgba(0,0,0,0)"
+        ),
+        margin=dict(l=0, r=0, t=0, b=0),
+        hovermode='closest',
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
+
+    return fig
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def knowledge_graph_view(doc_key, max_terms, window, max_edges, max_nodes):
+    """Build graph data and chart specs once per document and settings"""
+    nodes, edges = cached_knowledge_graph(doc_key, None, max_terms, window)
+    if nodes is None or edges is None:
+        return None
+
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "mind_map": build_mind_map(nodes, edges).source if not nodes.empty else None,
+        "figure": build_concept_figure(nodes, edges, max_edges, max_nodes).to_dict(),
+        "truncated": len(nodes) > max_nodes or len(edges) > max_edges,
+        "max_edges": max_edges,
+        "max_nodes": max_nodes
+    }
+
+
+def render_knowledge_graph(view):
+    """Render interactive knowledge graph visualization"""
+    if view is None:
+        return
 
-                for child in child_terms:
-                    dot.node(child, child)
-                    dot.edge(root_term, child)
+    with st.spinner("Rendering knowledge graph..."):
+        tab1, tab2 = st.tabs(["Mind Map", "Concept Map"])
 
-                for child in child_terms:
-                    grandchildren = nodes[nodes['term'] != child].sample(2)['term']
-                    for grandchild in grandchildren:
-                        dot.node(grandchild, grandchild)
-                        dot.edge(child, grandchild)
+        with tab1:
 
-                st.graphviz_chart(dot)
+            if view["mind_map"]:
+                st.graphviz_chart(view["mind_map"])
             else:
                 st.info("No data to render Mind Map.")
 
         with tab2:
-            fig = go.Figure()
-
-            # Add nodes
-            fig.add_trace(go.Scatter3d(
-                x=nodes['x'],
-                y=nodes['y'],
-                z=nodes['z'],
-                mode='markers+text',
-                marker=dict(
-                    size=nodes['size'] / 10,
-                    color=[f'rgb({r},{g},{b})' for r, g, b in zip(nodes['color_r'], nodes['color_g'], nodes['color_b'])],
-                    opacity=0.8,
-                    line=dict(width=2, color='DarkSlateGrey')
-                ),
-                text=nodes['term'],
-                textposition="middle center",
-                hoverinfo='text',
-                hovertext=nodes['term']
-            ))
-
-            for _, edge in edges.iterrows():
-                src = nodes.iloc[int(edge['source'])]
-                tgt = nodes.iloc[int(edge['target'])]
-
-                fig.add_trace(go.Scatter3d(
-                    x=[src['x'], tgt['x']],
-                    y=[src['y'], tgt['y']],
-                    z=[src['z'], tgt['z']],
-                    mode='lines',
-                    line=dict(
-                        color='rgba(150,150,150,0.5)',
-                        width=edge['value'] / 2
-                    ),
-                    hoverinfo='none',
-                    showlegend=False
-                ))
+            st.plotly_chart(view["figure"], use_container_width=True)
+            if view["truncated"]:
+                st.caption(
+                    f"Showing the {min(len(view['nodes']), view['max_nodes'])} most prominent terms "
+                    f"and up to {view['max_edges']} strongest relationships."
+                )
+            st.caption("Interactive 3D concept map showing relationships between key terms.")
 
-            fig.update_layout(
-                scene=dict(
-                    xaxis=dict(visible=False),
-                    yaxis=dict(visible=False),
-                    zaxis=dict(visible=False),
-                    bgcolor="rgba(0,0,0,0)"
-                ),
-                margin=dict(l=0, r=0, t=0, b=0),
-                hovermode='closest',
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)'
-            )
 
-            st.plotly_chart(fig, use_container_width=True)
-            st.caption("nteractive 3D concept map showing relationships between key terms.")
+def render_graph_settings():
+    """Let the user size the concept map and pick the co-occurrence window"""
+    with st.sidebar.expander("Knowledge Graph", expanded=False):
+        max_terms = st.number_input("Key terms", min_value=10, max_value=5000, value=MAX_TERMS, step=10)
+        window = st.selectbox("Co-occurrence window", WINDOWS)
+        max_edges = st.number_input("Max edges shown", min_value=10, max_value=20000, value=MAX_RENDER_EDGES, step=50)
+        max_nodes = st.number_input("Max terms shown", min_value=10, max_value=5000, value=MAX_RENDER_NODES, step=50)
+    return int(max_terms), window, int(max_edges), int(max_nodes)
 
 
 def main():
+    st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    render_model_panel()
+    render_performance_panel()
+    max_terms, window, max_edges, max_nodes = render_graph_settings()
+
     with st.container():
         st.markdown("""
         <div class="gradient-header">
@@ -279,48 +642,68 @@ def main():
         )
     
     if uploaded_file:
-        if ("uploaded_file_name" not in st.session_state or 
-            st.session_state.uploaded_file_name != uploaded_file.name):
-            st.session_state.raw_text = None
+        doc_key = document_key(uploaded_file.getbuffer())
+
+        if st.session_state.get("doc_key") != doc_key:
+            get_sessions().drop(st.session_state.session_id)
+            st.session_state.doc_key = doc_key
             st.session_state.summary = None
             st.session_state.questions = None
             st.session_state.qa_history = []
+            st.session_state.answered_question = None
             st.session_state.uploaded_file_name = uploaded_file.name
+            st.session_state.ingest_job = start_ingest_job(
+                doc_key, uploaded_file.getbuffer(), uploaded_file.type, max_terms, window
+            )
+            st.session_state.ingest_settled = frozenset()
         
         st.success(f"✅ **{uploaded_file.name}** uploaded successfully")
+
+        job = st.session_state.ingest_job
+        if not job.finished():
+            render_ingest_progress(job)
+        for stage in job.snapshot():
+            if stage["status"] == FAILED:
+                st.error(f"{INGEST_STAGES[stage['name']]} failed: {stage['error']}")
+
+        if job.ready("extract"):
+            if not get_cache().has(doc_key, "text.txt"):
+                restart_ingest()
+            extracted = job.result("extract")
+            if extracted.get("total_pages", 0) > extracted.get("pages", 0):
+                st.warning(
+                    f"Only the first {extracted['pages']} of {extracted['total_pages']} pages were processed."
+                )
+        indexed = job.ready("segment") and job.ready("sentences") and job.ready("passages")
+        if job.ready("summary"):
+            st.session_state.summary = job.result("summary")
         
-        if st.session_state.raw_text is None:
-            with st.spinner("🔍 Extracting document content..."):
-                if uploaded_file.type == "application/pdf":
-                    st.session_state.raw_text = extract_text_from_pdf(uploaded_file)
-                elif uploaded_file.type == "text/plain":
-                    st.session_state.raw_text = uploaded_file.read().decode("utf-8")
-        
-        if st.session_state.raw_text:
-            with st.expander("Document Knowledge Graph", expanded=True):
-                nodes, edges = create_knowledge_graph(st.session_state.raw_text)
-                render_knowledge_graph(nodes, edges)
-        
-        if st.session_state.summary is None:
-            with st.spinner("Generating intelligent summary..."):
-                st.session_state.summary = summarize_text(st.session_state.raw_text)
+        with st.expander("Document Knowledge Graph", expanded=True):
+            if job.ready("graph"):
+                render_knowledge_graph(knowledge_graph_view(doc_key, max_terms, window, max_edges, max_nodes))
+            elif job.status("graph") != FAILED:
+                st.info("Building knowledge graph...")
         
         with st.expander("Executive Summary", expanded=True):
-            st.markdown(f"""
-            <div class="card fade-in">
-                <div style="font-size: 0.9rem; color: #555; margin-bottom: 10px;">
-                    {len(st.session_state.summary.split())} words | Key Insights
-                </div>
-                <div style="line-height: 1.6;">
-                    {st.session_state.summary}
+            if st.session_state.summary is None:
+                if job.status("summary") != FAILED:
+                    render_summary_preview(job)
+            else:
+                st.markdown(f"""
+                <div class="card fade-in">
+                    <div style="font-size: 0.9rem; color: #555; margin-bottom: 10px;">
+                        {len(st.session_state.summary.split())} words | Key Insights
+                    </div>
+                    <div style="line-height: 1.6;">
+                        {st.session_state.summary}
+                    </div>
                 </div>
-            </div>
-            """, unsafe_allow_html=True)
+                """, unsafe_allow_html=True)
         
         
         mode = st.radio(
             "Select Interaction Mode:",
-            ["Ask Questions", "Test Knowledge"],
+            ["Ask Questions", "Ask the Library", "Test Knowledge"],
             horizontal=True,
             help="Choose how you want to interact with the document"
         )
@@ -335,14 +718,26 @@ def main():
                 user_question = st.text_input(
                     "Enter your question:", 
                     placeholder="What is the main hypothesis of this research?",
-                    key="question_input"
+                    key="question_input",
+                    disabled=not indexed,
+                    help="Available as soon as the document is indexed"
                 )
                 
-                if user_question:
+                if user_question and user_question != st.session_state.answered_question:
                     with st.spinner("Analyzing document..."):
-                        answer = ask_question_from_doc(user_question, st.session_state.raw_text)
+                        answer = ask_question_from_doc(
+                            user_question,
+                            session_artifact("text"),
+                            session_artifact("sentences"),
+                            session_artifact("passages"),
+                            session_artifact("page_offsets"),
+                            session_artifact("segments")
+                        )
                         st.session_state.qa_history.append((user_question, answer))
-                    
+                        st.session_state.answered_question = user_question
+
+                if user_question and st.session_state.qa_history:
+                    answer = st.session_state.qa_history[-1][1]
                     st.markdown(f"""
                     <div class="card fade-in" style="background-color: #f8f9fa; border-left: 4px solid var(--primary);">
                         <div style="font-weight: 500; margin-bottom: 8px;">Answer:</div>
@@ -363,6 +758,35 @@ def main():
                             <div style="margin-left: 15px; margin-top: 5px; color: #f8f9fa;">{a}</div>
                         </div>
                         """, unsafe_allow_html=True)
+
+        elif mode == "Ask the Library":
+            with st.container():
+                st.markdown("""
+                <div class="card fade-in">
+                    <h3 style="margin-top: 0;">Ask Across Your Library</h3>
+                """, unsafe_allow_html=True)
+
+                library_question = st.text_input(
+                    "Enter your question:",
+                    placeholder="Which papers evaluate on ImageNet?",
+                    key="library_question",
+                    disabled=len(get_document_library()) == 0,
+                    help="Add documents to the library from the sidebar first"
+                )
+
+                if library_question and library_question != st.session_state.get("library_answer", (None,))[0]:
+                    with st.spinner("Searching the library..."):
+                        st.session_state.library_answer = (
+                            library_question, ask_question_from_library(library_question, get_document_library())
+                        )
+
+                if library_question:
+                    st.markdown(f"""
+                    <div class="card fade-in" style="background-color: #f8f9fa; border-left: 4px solid var(--primary);">
+                        <div style="font-weight: 500; margin-bottom: 8px;">Answer:</div>
+                        <div style="line-height: 1.6;">{st.session_state.library_answer[1]}</div>
+                    </div>
+                    """, unsafe_allow_html=True)
         
         else:  
             with st.container():
@@ -372,9 +796,13 @@ def main():
                     <p style="color: #555;">Test your understanding with AI-generated questions</p>
                 """, unsafe_allow_html=True)
                 
-                if st.button("Generate Questions", key="generate_questions"):
+                if st.button("Generate Questions", key="generate_questions",
+                             disabled=not job.ready("extract")):
+                    placeholder = st.empty()
                     with st.spinner("Crafting thought-provoking questions..."):
-                        st.session_state.questions = generate_logic_questions(st.session_state.raw_text)
+                        generated = placeholder.write_stream(stream_logic_questions(session_artifact("text")))
+                    placeholder.empty()
+                    st.session_state.questions = parse_questions(generated)
                 
                 if "questions" in st.session_state and st.session_state.questions:
                     with st.form("challenge_form"):
@@ -396,25 +824,32 @@ def main():
                             <h4 style="margin-top: 0;">Evaluation Results</h4>
                         """, unsafe_allow_html=True)
                         
-                        for q, user_ans in responses.items():
-                            if user_ans.strip():
-                                with st.spinner(f"Evaluating: {q[:50]}..."):
-                                    feedback = evaluate_user_answer(st.session_state.raw_text, q, user_ans)
-                                
-                                if "correct" in feedback.lower():
-                                    st.markdown(f"""
-                                    <div style="background-color: #e8f5e9; padding: 15px; border-radius: 8px; margin-bottom: 15px; border-left: 4px solid #4caf50;">
-                                        <div style="font-weight: 500; color: #2e7d32;">✅ Correct</div>
-                                        <div style="margin-top: 5px; color: #555;">{feedback}</div>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                                else:
-                                    st.markdown(f"""
-                                    <div style="background-color: #ffebee; padding: 15px; border-radius: 8px; margin-bottom: 15px; border-left: 4px solid #f44336;">
-                                        <div style="font-weight: 500; color: #c62828;">⚠️ Needs Improvement</div>
-                                        <div style="margin-top: 5px; color: #555;">{feedback}</div>
-                                    </div>
-                                    """, unsafe_allow_html=True)
+                        answered = [(q, user_ans) for q, user_ans in responses.items() if user_ans.strip()]
+                        evaluations = []
+                        if answered:
+                            with st.spinner(f"Evaluating {len(answered)} answers..."):
+                                evaluations = evaluate_user_answers(
+                                    session_artifact("text"),
+                                    answered,
+                                    session_artifact("passages") if job.ready("passages") else None
+                                )
+
+                        for evaluation in evaluations:
+                            feedback = evaluation["feedback"]
+                            if evaluation["correct"]:
+                                st.markdown(f"""
+                                <div style="background-color: #e8f5e9; padding: 15px; border-radius: 8px; margin-bottom: 15px; border-left: 4px solid #4caf50;">
+                                    <div style="font-weight: 500; color: #2e7d32;">✅ Correct</div>
+                                    <div style="margin-top: 5px; color: #555;">{feedback}</div>
+                                </div>
+                                """, unsafe_allow_html=True)
+                            else:
+                                st.markdown(f"""
+                                <div style="background-color: #ffebee; padding: 15px; border-radius: 8px; margin-bottom: 15px; border-left: 4px solid #f44336;">
+                                    <div style="font-weight: 500; color: #c62828;">⚠️ Needs Improvement</div>
+                                    <div style="margin-top: 5px; color: #555;">{feedback}</div>
+                                </div>
+                                """, unsafe_allow_html=True)
     else:
         st.markdown("""
         <div class="card" style="text-align: center; padding: 40px 20px;">
@@ -425,10 +860,12 @@ def main():
             </p>
             <div style="font-size: 3rem; margin-bottom: 20px;">📄 ➔ 🧠</div>
             <p style="color: #777;">
-                Supports PDF and TXT documents. Your data is processed securely and never stored.
+                Supports PDF and TXT documents. Processed documents are cached on this server, and documents you add to the library are kept until you remove them.
             </p>
         </div>
         """, unsafe_allow_html=True)
+
+    render_library_panel()
     
     st.markdown("""
     <div style="text-align: center; margin-top: 50px; padding: 20px 0; color: #666; font-size: 0.9rem;">
@@ -0,0 +1,251 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import models
+from utils.cache import get_cache, document_key, artifact_name
+from utils.pdf_reader import extract_document_from_pdf
+from utils.summarizer import summarize_texts
+from utils.qa_engine import build_sentence_index, build_passage_index
+from utils.library import get_library
+from utils.concepts import get_concept_model
+from utils.knowledge_graph import split_windows
+from utils.segmenter import segment_document, SEGMENTATION_VERSION
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+
+def discover_files(inputs):
+    """Expand directories and glob patterns into a sorted list of documents"""
+    paths = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*")
+        for path in glob.glob(pattern, recursive=True):
+            if os.path.isfile(path) and path.lower().endswith(SUPPORTED_EXTENSIONS):
+                paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+
+def progress_path(output):
+    return output if output.endswith(".jsonl") else output + ".progress.jsonl"
+
+
+def load_done(output):
+    """Return paths already recorded in the progress file"""
+    path = progress_path(output)
+    if not os.path.exists(path):
+        return set()
+
+    done = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["path"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def extract_file(path):
+    """Read one document and return its text with page offsets"""
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if path.lower().endswith(".pdf"):
+        text, page_offsets = extract_document_from_pdf(data, workers=1, max_pages=0)
+    else:
+        text, page_offsets = data.decode("utf-8", errors="replace"), None
+
+    return {
+        "path": path,
+        "doc_key": document_key(data),
+        "text": text,
+        "page_offsets": page_offsets,
+        "pages": len(page_offsets) if page_offsets else 1,
+        "tokens": len(text.split()),
+        "extract_seconds": time.perf_counter() - started,
+    }
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage, seconds, docs=0, pages=0, tokens=0):
+        totals = self.stages.setdefault(stage, {"seconds": 0.0, "docs": 0, "pages": 0, "tokens": 0})
+        totals["seconds"] += seconds
+        totals["docs"] += docs
+        totals["pages"] += pages
+        totals["tokens"] += tokens
+
+    def report(self):
+        lines = []
+        for stage, totals in self.stages.items():
+            seconds = max(totals["seconds"], 1e-9)
+            lines.append(
+                f"{stage:<10} {totals['seconds']:8.2f}s  "
+                f"{totals['docs'] / seconds:8.2f} docs/s  "
+                f"{totals['pages'] / seconds:8.2f} pages/s  "
+                f"{totals['tokens'] / seconds:10.1f} tokens/s"
+            )
+        return "\n".join(lines)
+
+
+def process_batch(docs, args, timer):
+    """Summarize and index a batch of extracted documents"""
+    cache = get_cache()
+    pages = sum(doc["pages"] for doc in docs)
+    tokens = sum(doc["tokens"] for doc in docs)
+
+    segments_name = artifact_name("segments", SEGMENTATION_VERSION)
+    for doc in docs:
+        cache.put(doc["doc_key"], "text.txt", doc["text"])
+        if doc["page_offsets"]:
+            cache.put(doc["doc_key"], "pages.json", doc["page_offsets"])
+        doc["segments"] = cache.get_index(doc["doc_key"], segments_name)
+        if doc["segments"] is None:
+            doc["segments"] = cache.put_index(
+                doc["doc_key"], segments_name, segment_document(doc["text"], doc["page_offsets"])
+            )
+
+    started = time.perf_counter()
+    concepts = get_concept_model()
+    for doc in docs:
+        concepts.partial_fit(doc["doc_key"], split_windows(doc["text"], segments=doc["segments"]))
+    concepts.save(force=True)
+    timer.add("concepts", time.perf_counter() - started, len(docs), pages, tokens)
+
+    if not args.skip_summary:
+        started = time.perf_counter()
+        name = artifact_name("summary", models.model_tag("summarizer"), "beam") + ".json"
+        pending = [doc for doc in docs if not cache.has(doc["doc_key"], name)]
+        summaries = summarize_texts(
+            [doc["text"] for doc in pending], segments=[doc["segments"] for doc in pending]
+        ) if pending else []
+        for doc, summary in zip(pending, summaries):
+            cache.put(doc["doc_key"], name, summary)
+        for doc in docs:
+            doc["summary"] = cache.get(doc["doc_key"], name)
+        timer.add("summarize", time.perf_counter() - started, len(docs), pages, tokens)
+
+    if not args.skip_index:
+        started = time.perf_counter()
+        for kind, build in (("sentences", build_sentence_index), ("passages", build_passage_index)):
+            name = artifact_name(kind, models.model_tag("semantic"), SEGMENTATION_VERSION)
+            for doc in docs:
+                index = cache.get_index(doc["doc_key"], name)
+                if index is None:
+                    index = cache.put_index(doc["doc_key"], name, build(doc["text"], doc["segments"]))
+                doc[f"n_{kind}"] = len(index[kind])
+                if kind == "passages" and args.library:
+                    get_library().add(doc["doc_key"], os.path.basename(doc["path"]), index, doc["page_offsets"])
+        timer.add("index", time.perf_counter() - started, len(docs), pages, tokens)
+
+
+def rotate_progress(output):
+    """Move an earlier progress file aside so a fresh run does not append to it"""
+    path = progress_path(output)
+    if os.path.exists(path):
+        os.replace(path, path + ".previous")
+        print(f"Moved earlier results to {path}.previous", file=sys.stderr)
+
+
+def write_records(docs, output):
+    with open(progress_path(output), "a", encoding="utf-8") as f:
+        for doc in docs:
+            record = {key: value for key, value in doc.items() if key not in ("text", "page_offsets", "segments")}
+            f.write(json.dumps(record) + "\n")
+
+
+def check_output(output):
+    """Fail before any work if the output format cannot be written"""
+    if not output.endswith(".parquet"):
+        return
+    for engine in ("pyarrow", "fastparquet"):
+        try:
+            __import__(engine)
+            return
+        except ImportError:
+            continue
+    sys.exit(f"Writing {output} needs pyarrow or fastparquet: pip install pyarrow")
+
+
+def finalize_output(output):
+    if not os.path.exists(progress_path(output)):
+        print(f"No documents were recorded, {output} was not written", file=sys.stderr)
+        return
+    if output.endswith(".parquet"):
+        import pandas as pd
+        pd.read_json(progress_path(output), lines=True).to_parquet(output, index=False)
+
+
+def run(args):
+    check_output(args.output)
+    files = discover_files(args.inputs)
+    if args.resume:
+        done = load_done(args.output)
+    else:
+        rotate_progress(args.output)
+        done = set()
+    pending = [path for path in files if path not in done]
+    print(f"{len(files)} documents found, {len(files) - len(pending)} already processed", file=sys.stderr)
+
+    timer = StageTimer()
+    started = time.perf_counter()
+    completed = pages = tokens = 0
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for start in range(0, len(pending), args.batch_size * 4):
+            group = pending[start:start + args.batch_size * 4]
+
+            extract_started = time.perf_counter()
+            docs = []
+            futures = [pool.submit(extract_file, path) for path in group]
+            for path, future in zip(group, futures):
+                try:
+                    docs.append(future.result())
+                except Exception as e:
+                    print(f"Skipping {path}: {e}", file=sys.stderr)
+            timer.add(
+                "extract",
+                time.perf_counter() - extract_started,
+                len(docs),
+                sum(doc["pages"] for doc in docs),
+                sum(doc["tokens"] for doc in docs)
+            )
+
+            for batch_start in range(0, len(docs), args.batch_size):
+                batch = docs[batch_start:batch_start + args.batch_size]
+                process_batch(batch, args, timer)
+                write_records(batch, args.output)
+                completed += len(batch)
+                pages += sum(doc["pages"] for doc in batch)
+                tokens += sum(doc["tokens"] for doc in batch)
+                print(f"[{completed}/{len(pending)}] processed", file=sys.stderr)
+
+    finalize_output(args.output)
+    timer.add("total", time.perf_counter() - started, completed, pages, tokens)
+    print(timer.report())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Batch-process a corpus of research documents")
+    parser.add_argument("inputs", nargs="+", help="Directories or glob patterns of PDF/TXT files")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="Output file (.jsonl or .parquet)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Extraction worker processes")
+    parser.add_argument("-b", "--batch-size", type=int, default=8, help="Documents per model batch")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", help="Start a fresh output, keeping the previous one as .previous")
+    parser.add_argument("--skip-summary", action="store_true", help="Do not generate summaries")
+    parser.add_argument("--skip-index", action="store_true", help="Do not build sentence and passage indexes")
+    parser.add_argument("--library", action="store_true", help="Add each document's passages to the document library")
+    return parser
+
+
+if __name__ == "__main__":
+    run(build_parser().parse_args())
@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from itertools import count, cycle
+import tracemalloc
+
+import numpy as np
+
+from utils import models
+from utils import qa_engine
+from utils.library import Library, N_PROBE, TOP_K_LIBRARY
+from utils.metrics import resident_memory
+from utils.pdf_reader import extract_text_from_pdf, spool_document_from_pdf
+from utils.summarizer import summarize_text
+from utils.qa_engine import (
+    ask_question_from_doc, get_justification_snippet, build_sentence_index, build_passage_index
+)
+from utils.concepts import ConceptModel
+from utils.knowledge_graph import build_knowledge_graph, split_windows
+from utils.segmenter import segment_document
+from benchmarks.stubs import EMBEDDING_DIM
+
+WORDS_PER_PAGE = 350
+DEFAULT_PAGES = (1, 10, 50, 200, 500)
+LIBRARY_PASSAGES = (20000,)
+LIBRARY_DOCUMENTS = 100
+LIBRARY_TOPICS = 256
+LIBRARY_QUERIES = 200
+REGRESSION_RATIO = 1.1
+QUESTIONS = [
+    "What is the main contribution of this work?",
+    "Which dataset was used in the experiments?",
+    "How does the proposed model compare to the baseline?",
+]
+VOCABULARY = (
+    "model data attention network training results baseline accuracy method experiment "
+    "transformer retrieval passage document embedding layer gradient loss evaluation benchmark "
+    "proposed approach significant improvement dataset analysis performance latency memory graph"
+).split()
+
+
+def synthetic_text(pages, seed=0):
+    """Generate deterministic paper-like text of roughly pages * WORDS_PER_PAGE words"""
+    rng = np.random.default_rng(seed)
+    words = rng.choice(VOCABULARY, size=pages * WORDS_PER_PAGE)
+    lengths = rng.integers(8, 25, size=len(words))
+
+    sentences, position = [], 0
+    for length in lengths:
+        if position >= len(words):
+            break
+        chunk = words[position:position + length]
+        sentences.append(" ".join(chunk).capitalize() + ".")
+        position += length
+    return " ".join(sentences)
+
+
+def synthetic_pdf(pages, seed=0):
+    """Render synthetic text into an in-memory PDF with the requested page count"""
+    import fitz
+
+    text = synthetic_text(pages, seed).split()
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        words = text[page_number * WORDS_PER_PAGE:(page_number + 1) * WORDS_PER_PAGE]
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), " ".join(words), fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def synthetic_embeddings(passages, queries, seed=0):
+    """Draw unit vectors clustered around shared topics, standing in for passage and question embeddings"""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((LIBRARY_TOPICS, EMBEDDING_DIM)).astype(np.float32)
+
+    def draw(n):
+        noise = rng.standard_normal((n, EMBEDDING_DIM), dtype=np.float32)
+        vectors = topics[rng.integers(LIBRARY_TOPICS, size=n)] + noise
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    return draw(passages), draw(queries)
+
+
+def spool_pdf(pdf):
+    """Stream PDF text into a temporary file the way the app's ingest job does"""
+    with tempfile.TemporaryFile() as f:
+        return spool_document_from_pdf(pdf, lambda chunk: f.write(chunk.encode("utf-8")), max_pages=0)
+
+
+def measure(fn, repeats):
+    """Run fn repeatedly and return latency percentiles plus peak memory"""
+    fn()
+
+    latencies = []
+    rss_before = resident_memory()
+    tracemalloc.start()
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = np.array(latencies)
+    return {
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p90_ms": float(np.percentile(latencies, 90) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "mean_ms": float(latencies.mean() * 1000),
+        "peak_traced_mb": peak / 2 ** 20,
+        "rss_delta_mb": max(resident_memory() - rss_before, 0) / 2 ** 20,
+    }
+
+
+def benchmark_size(pages, repeats):
+    text = synthetic_text(pages)
+    pdf = synthetic_pdf(pages)
+    segments = segment_document(text)
+    sentence_index = build_sentence_index(text, segments)
+    passage_index = build_passage_index(text, segments)
+    answer = " ".join(text.split()[100:103])
+    windows = split_windows(text, segments=segments)
+    concepts = ConceptModel(tempfile.mkdtemp(prefix="neuroscholar-concepts-"))
+    doc_keys = count()
+
+    def ask_questions():
+        qa_engine.clear_answer_caches()
+        return [ask_question_from_doc(q, text, sentence_index, passage_index, segments=segments) for q in QUESTIONS]
+
+    stages = {
+        "extract_text_from_pdf": (lambda: extract_text_from_pdf(pdf, max_pages=0), pages, "pages"),
+        "spool_document_from_pdf": (lambda: spool_pdf(pdf), pages, "pages"),
+        "segment_document": (lambda: segment_document(text), pages, "pages"),
+        "build_indexes": (
+            lambda: (build_sentence_index(text, segments), build_passage_index(text, segments)), pages, "pages"
+        ),
+        "summarize_text": (lambda: summarize_text(text, segments=segments), 1, "docs"),
+        "ask_question_from_doc": (ask_questions, len(QUESTIONS), "questions"),
+        "get_justification_snippet": (
+            lambda: get_justification_snippet(answer, text, sentence_index), 1, "lookups"
+        ),
+        "fit_concepts": (lambda: concepts.partial_fit(next(doc_keys), windows), pages, "pages"),
+        "create_knowledge_graph": (
+            lambda: build_knowledge_graph(text, segments=segments, concept_model=concepts), pages, "pages"
+        ),
+    }
+
+    results = []
+    for stage, (fn, units, unit_name) in stages.items():
+        stats = measure(fn, repeats)
+        stats.update({
+            "stage": stage,
+            "pages": pages,
+            "words": len(text.split()),
+            "throughput": units / max(stats["mean_ms"] / 1000, 1e-9),
+            "throughput_unit": f"{unit_name}/s",
+        })
+        results.append(stats)
+        print(
+            f"{stage:<26} {pages:>4}p  p50 {stats['p50_ms']:9.1f}ms  p90 {stats['p90_ms']:9.1f}ms  "
+            f"{stats['throughput']:10.1f} {unit_name}/s  peak {stats['peak_traced_mb']:7.1f}MB",
+            file=sys.stderr
+        )
+    return results
+
+
+def benchmark_library(passages, top_k=TOP_K_LIBRARY):
+    vectors, queries = synthetic_embeddings(passages, LIBRARY_QUERIES)
+    bounds = np.linspace(0, passages, LIBRARY_DOCUMENTS + 1).astype(int)
+
+    with tempfile.TemporaryDirectory(prefix="neuroscholar-library-") as root:
+        library = Library(root)
+        offsets = {}
+        started = time.perf_counter()
+        for doc, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+            offsets[str(doc)] = start
+            library.add(str(doc), f"doc-{doc}", {"embeddings": vectors[start:stop], "passages": [""] * (stop - start)})
+        ingest_s = time.perf_counter() - started
+
+        found = 0
+        for query in queries:
+            exact = set(np.argsort(-(vectors @ query))[:top_k].tolist())
+            found += len(exact & {offsets[key] + passage for key, passage, _ in library.search(query, top_k)})
+
+        pending = cycle(queries)
+        stats = measure(lambda: library.search(next(pending), top_k), LIBRARY_QUERIES)
+
+    stats.update({
+        "stage": "library_search",
+        "pages": 0,
+        "passages": passages,
+        "n_probe": N_PROBE,
+        f"recall_at_{top_k}": found / (top_k * len(queries)),
+        "ingest_s": ingest_s,
+        "throughput": 1000 / max(stats["mean_ms"], 1e-9),
+        "throughput_unit": "queries/s",
+    })
+    print(
+        f"{'library_search':<26} {passages:>7}  p50 {stats['p50_ms']:9.2f}ms  p90 {stats['p90_ms']:9.2f}ms  "
+        f"recall@{top_k} {stats[f'recall_at_{top_k}']:.3f}  ingest {ingest_s:.1f}s",
+        file=sys.stderr
+    )
+    return stats
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["stage"], r["pages"], r.get("passages")): r for r in json.load(f)["results"]}
+
+    for result in current:
+        previous = baseline.get((result["stage"], result["pages"], result.get("passages")))
+        if previous:
+            ratio = result["p50_ms"] / max(previous["p50_ms"], 1e-9)
+            flag = "  REGRESSION" if ratio > REGRESSION_RATIO else ""
+            print(f"{result['stage']:<26} {result['pages']:>4}p  p50 x{ratio:.2f}{flag}")
+
+
+def run(args):
+    if not args.real_models:
+        from benchmarks.stubs import StubRegistry
+        models.registry = StubRegistry()
+
+    results = []
+    for pages in args.pages:
+        results.extend(benchmark_size(pages, args.repeats))
+    for passages in args.library_passages:
+        results.append(benchmark_library(passages))
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "models": "real" if args.real_models else "stub",
+        "repeats": args.repeats,
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the document pipeline on synthetic documents")
+    parser.add_argument("--pages", type=int, nargs="+", default=list(DEFAULT_PAGES), help="Document sizes to test")
+    parser.add_argument(
+        "--library-passages", type=int, nargs="*", default=list(LIBRARY_PASSAGES),
+        help="Library sizes to test search latency and recall at; pass no values to skip"
+    )
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per stage after one warm-up")
+    parser.add_argument("--real-models", action="store_true", help="Use the configured models instead of stubs")
+    parser.add_argument("-o", "--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Compare p50 latencies against a previous JSON run")
+    return parser
+
+
+if __name__ == "__main__":
+    run(build_parser().parse_args())
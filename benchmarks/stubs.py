@@ -0,0 +1,83 @@
+import hashlib
+import time
+
+import numpy as np
+
+from utils.models import ModelRegistry
+
+EMBEDDING_DIM = 384
+
+
+class StubTokenizer:
+    model_max_length = 1024
+    pad_token = "<pad>"
+    eos_token = "<eos>"
+    pad_token_id = 0
+    eos_token_id = 0
+
+    def __call__(self, texts, add_special_tokens=False, **kwargs):
+        if isinstance(texts, str):
+            return {"input_ids": list(range(len(texts.split())))}
+        return {"input_ids": [list(range(len(text.split()))) for text in texts]}
+
+    def decode(self, ids, **kwargs):
+        return " ".join("token" for _ in ids)
+
+
+class StubEmbedder:
+    def get_sentence_embedding_dimension(self):
+        return EMBEDDING_DIM
+
+    def encode(self, texts, normalize_embeddings=False, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else texts
+
+        embeddings = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                embeddings[row, int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % EMBEDDING_DIM] += 1
+        if normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-9)
+        return embeddings[0] if single else embeddings
+
+
+class StubPipeline:
+    def __init__(self, task, seconds_per_item=0.0):
+        self.task = task
+        self.seconds_per_item = seconds_per_item
+        self.tokenizer = StubTokenizer()
+
+    def __call__(self, inputs=None, question=None, context=None, max_length=60, **kwargs):
+        if self.task == "question-answering":
+            time.sleep(self.seconds_per_item * len(question))
+            outputs = []
+            for ctx in context:
+                answer = " ".join(ctx.split()[:3])
+                outputs.append({"answer": answer, "score": 0.5, "start": 0, "end": len(answer)})
+            return outputs
+
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        time.sleep(self.seconds_per_item * len(inputs))
+        if self.task == "summarization":
+            return [{"summary_text": " ".join(text.split()[:max_length])} for text in inputs]
+        return [[{"generated_text": text + "\n1. What is claimed?\n2. How is it shown?\n3. Why?"}] for text in inputs]
+
+
+STUB_MODELS = {
+    "summarizer": lambda: StubPipeline("summarization"),
+    "qa": lambda: StubPipeline("question-answering"),
+    "text_gen": lambda: StubPipeline("text-generation"),
+    "semantic": StubEmbedder,
+}
+
+
+class StubRegistry(ModelRegistry):
+    def _load(self, name):
+        started = time.perf_counter()
+        self._models[name] = STUB_MODELS[name]()
+        self._stats[name] = {
+            "model": "stub",
+            "backend": "stub",
+            "load_seconds": time.perf_counter() - started,
+            "memory_mb": 0.0,
+        }
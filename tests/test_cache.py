@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.cache import DocumentCache, artifact_name, document_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DocumentCache(str(tmp_path / "cache"), max_bytes=10 ** 9)
+
+
+def test_document_key_is_content_addressed():
+    assert document_key(b"paper") == document_key(b"paper")
+    assert document_key(b"paper") != document_key(b"other paper")
+
+
+def test_artifact_name_depends_on_tags():
+    assert artifact_name("segments") == "segments"
+    assert artifact_name("index", "model", 1) == artifact_name("index", "model", 1)
+    assert artifact_name("index", "model", 1) != artifact_name("index", "model", 2)
+    assert artifact_name("index", "model", 1).startswith("index-")
+
+
+@pytest.mark.parametrize("name, value", [
+    ("meta.json", {"pages": 3, "title": "Paper"}),
+    ("text.txt", "Introduction\nWe study caching."),
+    ("fields.pkl", {"tuple": (1, 2), "set": {3}}),
+])
+def test_put_get_round_trip(cache, name, value):
+    cache.put("doc", name, value)
+    assert cache.get("doc", name) == value
+
+
+def test_arrays_are_memory_mapped(cache):
+    cache.put("doc", "vectors.npy", np.arange(12, dtype=np.float32).reshape(3, 4))
+    loaded = cache.get("doc", "vectors.npy")
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, np.arange(12, dtype=np.float32).reshape(3, 4))
+
+
+def test_missing_and_corrupt_artifacts_return_default(cache):
+    assert cache.get("doc", "meta.json", default="missing") == "missing"
+    cache.put("doc", "meta.json", {"ok": True})
+    with open(os.path.join(cache.root, "doc", "meta.json"), "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert cache.get("doc", "meta.json") is None
+
+
+def test_get_or_compute_computes_once(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"value": 42}
+
+    assert cache.get_or_compute("doc", "value.json", compute) == {"value": 42}
+    assert cache.get_or_compute("doc", "value.json", compute) == {"value": 42}
+    assert len(calls) == 1
+
+
+def test_index_round_trip_splits_arrays(cache):
+    index = {"embeddings": np.ones((2, 3), dtype=np.float32), "passages": ["a", "b"]}
+    cache.put_index("doc", "passages", index)
+    assert cache.has("doc", "passages.embeddings.npy")
+
+    loaded = cache.get_index("doc", "passages")
+    assert loaded["passages"] == ["a", "b"]
+    np.testing.assert_array_equal(loaded["embeddings"], index["embeddings"])
+
+    os.remove(os.path.join(cache.root, "doc", "passages.embeddings.npy"))
+    assert cache.get_index("doc", "passages") is None
+
+
+def test_spool_streams_text_and_returns_fill_result(cache):
+    def fill(write):
+        for chunk in ("first ", "second ", "third"):
+            write(chunk)
+        return 3
+
+    assert cache.spool("doc", "text.txt", fill) == 3
+    assert cache.get("doc", "text.txt") == "first second third"
+
+
+def test_failed_spool_leaves_no_partial_file(cache):
+    def fill(write):
+        write("partial")
+        raise RuntimeError("extraction failed")
+
+    with pytest.raises(RuntimeError):
+        cache.spool("doc", "text.txt", fill)
+    assert not cache.has("doc", "text.txt")
+    assert os.listdir(os.path.join(cache.root, "doc")) == []
+
+
+def test_eviction_removes_least_recently_used_documents(tmp_path):
+    cache = DocumentCache(str(tmp_path / "cache"), max_bytes=10 ** 9)
+    for age, doc_key in enumerate(["old", "middle", "new"]):
+        cache.put(doc_key, "blob.npy", np.zeros(1000, dtype=np.uint8))
+        os.utime(os.path.join(cache.root, doc_key), (1000 + age, 1000 + age))
+
+    cache.get("old", "blob.npy")
+    cache.max_bytes = 2500
+    cache.evict()
+
+    assert cache.has("old", "blob.npy")
+    assert cache.has("new", "blob.npy")
+    assert not cache.has("middle", "blob.npy")
+    assert cache.size() <= 2500
+
+
+def test_put_over_budget_triggers_eviction(tmp_path):
+    cache = DocumentCache(str(tmp_path / "cache"), max_bytes=1500)
+    cache.put("first", "blob.npy", np.zeros(1000, dtype=np.uint8))
+    os.utime(os.path.join(cache.root, "first"), (1000, 1000))
+    cache.put("second", "blob.npy", np.zeros(1000, dtype=np.uint8))
+
+    assert not cache.has("first", "blob.npy")
+    assert cache.has("second", "blob.npy")
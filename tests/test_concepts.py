@@ -0,0 +1,173 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from utils.concepts import ConceptModel, count_terms, N_COMPONENTS
+
+DOCUMENTS = {
+    "neural": [
+        "Neural networks learn representations with gradient descent.",
+        "Deep neural networks use many layers trained by gradient descent.",
+        "Attention layers let neural networks model long sequences.",
+    ],
+    "retrieval": [
+        "Retrieval systems rank passages for a query.",
+        "Dense retrieval encodes passages and queries as embeddings.",
+        "Sparse retrieval ranks passages with term statistics.",
+    ],
+    "graphs": [
+        "Knowledge graphs connect concepts with weighted edges.",
+        "Graph layouts place related concepts close together.",
+        "Edges in the concept graph reflect co-occurrence.",
+    ],
+}
+
+
+def model(root, **kwargs):
+    return ConceptModel(str(root), n_features=2 ** 12, **kwargs)
+
+
+def fit_all(concepts, documents=DOCUMENTS):
+    for doc_key, windows in documents.items():
+        concepts.partial_fit(doc_key, windows)
+
+
+def test_documents_are_counted_once(tmp_path):
+    concepts = model(tmp_path)
+    assert concepts.partial_fit("neural", DOCUMENTS["neural"])
+    assert not concepts.partial_fit("neural", DOCUMENTS["neural"])
+    assert not concepts.partial_fit("empty", ["the and of", "it is"])
+    assert concepts.n_docs == 1
+    assert concepts.documents == {"neural"}
+
+
+def test_concurrent_fits_of_one_document_count_once(tmp_path):
+    concepts = model(tmp_path)
+    threads = [threading.Thread(target=concepts.partial_fit, args=("neural", DOCUMENTS["neural"])) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reference = model(tmp_path / "reference")
+    reference.partial_fit("neural", DOCUMENTS["neural"])
+    assert concepts.n_docs == 1
+    np.testing.assert_array_equal(concepts.doc_freq, reference.doc_freq)
+    np.testing.assert_allclose(concepts.sketch, reference.sketch)
+
+
+def test_save_and_reload(tmp_path):
+    concepts = model(tmp_path)
+    fit_all(concepts)
+    assert concepts.save(force=True)
+
+    reloaded = model(tmp_path)
+    assert reloaded.n_docs == 3
+    assert reloaded.documents == set(DOCUMENTS)
+    np.testing.assert_array_equal(reloaded.doc_freq, concepts.doc_freq)
+    np.testing.assert_allclose(reloaded.sketch, concepts.sketch)
+
+
+def test_incompatible_state_is_ignored(tmp_path):
+    concepts = model(tmp_path)
+    fit_all(concepts)
+    concepts.save(force=True)
+
+    other = model(tmp_path, sketch_rank=8)
+    assert other.n_docs == 0
+    assert other.sketch.shape == (2 ** 12, 8)
+
+
+def test_saves_from_separate_instances_merge(tmp_path):
+    first, second = model(tmp_path), model(tmp_path)
+    first.partial_fit("neural", DOCUMENTS["neural"])
+    first.partial_fit("graphs", DOCUMENTS["graphs"])
+    second.partial_fit("retrieval", DOCUMENTS["retrieval"])
+    second.partial_fit("graphs", DOCUMENTS["graphs"])
+    first.save(force=True)
+    second.save(force=True)
+
+    merged = model(tmp_path)
+    reference = model(tmp_path / "reference")
+    fit_all(reference)
+    assert merged.documents == set(DOCUMENTS)
+    assert merged.n_docs == 3
+    np.testing.assert_array_equal(merged.doc_freq, reference.doc_freq)
+    np.testing.assert_allclose(merged.sketch, reference.sketch, rtol=1e-5, atol=1e-5)
+    assert second.documents == set(DOCUMENTS)
+
+
+def test_saves_are_debounced(tmp_path):
+    concepts = model(tmp_path, save_interval=60)
+    concepts.partial_fit("neural", DOCUMENTS["neural"])
+    assert concepts.save()
+
+    concepts.partial_fit("retrieval", DOCUMENTS["retrieval"])
+    assert not concepts.save()
+    assert model(tmp_path).n_docs == 1
+    assert concepts.save(force=True)
+    assert model(tmp_path).n_docs == 2
+    assert not concepts.save(force=True)
+
+
+def test_deferred_save_is_flushed_by_timer(tmp_path):
+    concepts = model(tmp_path, save_interval=0.2)
+    concepts.partial_fit("neural", DOCUMENTS["neural"])
+    concepts.save()
+    concepts.partial_fit("retrieval", DOCUMENTS["retrieval"])
+    assert not concepts.save()
+
+    for _ in range(100):
+        if model(tmp_path).n_docs == 2:
+            break
+        time.sleep(0.02)
+    assert model(tmp_path).n_docs == 2
+
+
+def test_term_coordinates_match_exact_lsa(tmp_path):
+    concepts = model(tmp_path, sketch_rank=64)
+    fit_all(concepts)
+
+    gram = 0
+    for windows in DOCUMENTS.values():
+        counts, terms = count_terms(windows)
+        X = concepts._hashed(counts, terms).toarray().astype(np.float64)
+        gram = gram + X.T @ X
+    active = np.flatnonzero(concepts.doc_freq)
+    assert len(active) < 64
+
+    weights = concepts.idf(active)
+    exact = weights[:, None] * gram[np.ix_(active, active)] * weights[None, :]
+    values, vectors = np.linalg.eigh(exact)
+    top = vectors[:, -N_COMPONENTS:] * values[-N_COMPONENTS:]
+    expected = top @ vectors[:, -N_COMPONENTS:].T
+
+    coordinates = concepts.term_coordinates()[active].astype(np.float64)
+    strengths = np.linalg.svd(coordinates, compute_uv=False) ** 2
+    np.testing.assert_allclose(strengths, values[::-1][:N_COMPONENTS], rtol=0.02)
+    np.testing.assert_allclose(coordinates @ coordinates.T, expected, atol=0.03 * np.abs(expected).max())
+    assert not concepts.term_coordinates()[np.flatnonzero(concepts.doc_freq == 0)].any()
+
+
+def test_transform_keeps_top_terms_with_coordinates(tmp_path):
+    concepts = model(tmp_path)
+    fit_all(concepts)
+
+    X, terms, coordinates = concepts.transform(DOCUMENTS["neural"], max_terms=5)
+    assert X.shape == (3, 5)
+    assert len(terms) == 5
+    assert coordinates.shape == (5, N_COMPONENTS)
+    assert "neural" in terms and "networks" in terms
+
+    X, terms, coordinates = concepts.transform(["the and of"], max_terms=5)
+    assert X.shape[1] == 0
+    assert len(terms) == 0
+
+
+@pytest.mark.parametrize("windows", [[], ["of the and"]])
+def test_count_terms_handles_empty_vocabulary(windows):
+    counts, terms = count_terms(windows)
+    assert counts is None
+    assert len(terms) == 0
@@ -0,0 +1,154 @@
+import threading
+
+import numpy as np
+import pytest
+
+from benchmarks.stubs import StubPipeline, StubRegistry, EMBEDDING_DIM
+from utils import inference, models
+from utils.inference import BatchWorker, InferenceOverloaded, InferenceServer, call_model, infer
+
+
+class RecordingPipeline(StubPipeline):
+    def __init__(self, seconds_per_item=0.0, release=None):
+        super().__init__("question-answering", seconds_per_item)
+        self.release = release
+        self.started = []
+        self.batch_sizes = []
+
+    def __call__(self, question=None, context=None, **kwargs):
+        self.started.append(len(question))
+        if self.release is not None:
+            self.release.wait(5)
+        self.batch_sizes.append(len(question))
+        if any(q == "fail" for q in question):
+            raise ValueError("model failed")
+        return super().__call__(question=question, context=context, **kwargs)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = StubRegistry()
+    monkeypatch.setattr(models, "registry", registry)
+    return registry
+
+
+def use_qa(registry, pipeline):
+    registry._models["qa"] = pipeline
+    return pipeline
+
+
+def test_call_model_shapes_outputs(registry):
+    pairs = [("What?", "alpha beta gamma delta"), ("Why?", "one two three four")]
+    answers = call_model("qa", models.get_model("qa"), pairs)
+    assert [a["answer"] for a in answers] == ["alpha beta gamma", "one two three"]
+
+    embeddings = call_model("semantic", models.get_model("semantic"), ["a b", "c d", "e f"])
+    assert len(embeddings) == 3
+    assert embeddings[0].shape == (EMBEDDING_DIM,)
+
+
+def test_call_model_wraps_single_qa_answer(registry):
+    class SinglePipeline:
+        def __call__(self, **kwargs):
+            return {"answer": "only", "score": 1.0}
+
+    assert call_model("qa", SinglePipeline(), [("q", "c")]) == [{"answer": "only", "score": 1.0}]
+
+
+def test_server_keeps_outputs_in_input_order(registry):
+    pipeline = use_qa(registry, RecordingPipeline())
+    server = InferenceServer({"qa": 4})
+    pairs = [(f"q{i}", f"word{i} a b c") for i in range(10)]
+
+    answers = server("qa", pairs)
+    assert [a["answer"] for a in answers] == [f"word{i} a b" for i in range(10)]
+    assert max(pipeline.batch_sizes) <= 4
+    assert sum(pipeline.batch_sizes) == 10
+
+
+def test_concurrent_callers_share_batches(registry):
+    release = threading.Event()
+    pipeline = use_qa(registry, RecordingPipeline(release=release))
+    server = InferenceServer({"qa": 16})
+    results = {}
+
+    def ask(i):
+        results[i] = server("qa", [(f"q{i}", f"answer{i} x y z")])[0]["answer"]
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for _ in range(500):
+        if server.stats() and sum(pipeline.started) + server.stats()[0]["queued"] == 8:
+            break
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == {i: f"answer{i} x y" for i in range(8)}
+    assert len(pipeline.batch_sizes) < 8
+    stats = server.stats()[0]
+    assert stats["model"] == "qa"
+    assert stats["batches"] == len(pipeline.batch_sizes)
+
+
+def test_model_errors_reach_every_caller_in_the_batch(registry):
+    use_qa(registry, RecordingPipeline())
+    server = InferenceServer()
+    with pytest.raises(ValueError, match="model failed"):
+        server("qa", [("fail", "context"), ("ok", "context")])
+    assert server("qa", [("ok", "context words here")])[0]["answer"] == "context words here"
+
+
+def test_timeout_applies_to_each_item(registry):
+    pipeline = use_qa(registry, RecordingPipeline(seconds_per_item=0.1))
+    server = InferenceServer({"qa": 1})
+
+    answers = server("qa", [(f"q{i}", f"w{i} a b c") for i in range(6)], timeout=0.35)
+    assert len(answers) == 6
+    assert pipeline.batch_sizes == [1] * 6
+
+
+def test_stalled_model_raises_timeout_naming_the_model(registry):
+    release = threading.Event()
+    use_qa(registry, RecordingPipeline(release=release))
+    server = InferenceServer({"qa": 1})
+    try:
+        with pytest.raises(TimeoutError, match="qa inference did not finish within 0.1s"):
+            server("qa", [("q1", "c"), ("q2", "c")], timeout=0.1)
+    finally:
+        release.set()
+
+
+def test_full_queue_raises_overloaded(registry):
+    release = threading.Event()
+    use_qa(registry, RecordingPipeline(release=release))
+    worker = BatchWorker("qa", {}, max_batch_size=1, max_queue=1)
+    try:
+        worker.submit(("q", "c"))
+        while worker.requests.qsize():
+            threading.Event().wait(0.01)
+        worker.submit(("q", "c"))
+        with pytest.raises(InferenceOverloaded):
+            worker.submit(("q", "c"), timeout=0.01)
+    finally:
+        release.set()
+
+
+def test_infer_without_server_chunks_by_batch_size(registry, monkeypatch):
+    pipeline = use_qa(registry, RecordingPipeline())
+    monkeypatch.setattr(inference, "INFERENCE_SERVER", False)
+    monkeypatch.setitem(inference.MAX_BATCH_SIZES, "qa", 3)
+
+    answers = infer("qa", [(f"q{i}", f"w{i} a b c") for i in range(7)])
+    assert len(answers) == 7
+    assert pipeline.batch_sizes == [3, 3, 1]
+    assert infer("qa", []) == []
+
+
+def test_semantic_batches_match_direct_encoding(registry):
+    texts = ["attention model", "retrieval passage", "graph memory"]
+    served = np.stack(InferenceServer()("semantic", texts, normalize_embeddings=True))
+    direct = models.get_model("semantic").encode(texts, normalize_embeddings=True)
+    np.testing.assert_allclose(served, direct)
@@ -0,0 +1,203 @@
+import multiprocessing
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from benchmarks.stubs import StubRegistry
+from utils import library as library_module
+from utils import models
+from utils.library import Library, answer_from_library, train_centroids, assign_lists
+
+DIM = 32
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    registry = StubRegistry()
+    monkeypatch.setattr(models, "registry", registry)
+    return registry
+
+
+@pytest.fixture
+def small_ivf(monkeypatch):
+    monkeypatch.setattr(library_module, "MIN_IVF_PASSAGES", 200)
+
+
+def clustered(n, seed=0, topics=16):
+    rng = np.random.default_rng(seed)
+    centers = np.random.default_rng(99).standard_normal((topics, DIM))
+    vectors = centers[rng.integers(topics, size=n)] + 0.5 * rng.standard_normal((n, DIM))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def add(library, doc_key, embeddings, page_offsets=None):
+    passages = [f"{doc_key} passage {i}" for i in range(len(embeddings))]
+    starts = [i * 10 for i in range(len(embeddings))]
+    library.add(doc_key, f"{doc_key}.pdf", {"embeddings": embeddings, "passages": passages, "starts": starts},
+                page_offsets)
+
+
+def exact_top(vectors, query, k=5):
+    return set(np.argsort(-(vectors @ query))[:k].tolist())
+
+
+def hits_as_rows(hits, offsets):
+    return {offsets[doc_key] + passage for doc_key, passage, _ in hits}
+
+
+def test_small_library_is_searched_exhaustively(tmp_path):
+    library = Library(str(tmp_path))
+    vectors = clustered(60)
+    add(library, "a", vectors[:30])
+    add(library, "b", vectors[30:])
+
+    assert library._index is None
+    assert library.passage_count() == 60
+    for query in clustered(10, seed=1):
+        assert hits_as_rows(library.search(query), {"a": 0, "b": 30}) == exact_top(vectors, query)
+
+
+def test_ivf_index_matches_exact_search(tmp_path, small_ivf):
+    library = Library(str(tmp_path))
+    vectors = clustered(800)
+    offsets = {}
+    for doc in range(8):
+        offsets[str(doc)] = doc * 100
+        add(library, str(doc), vectors[doc * 100:(doc + 1) * 100])
+
+    assert library._index is not None
+    found = sum(len(hits_as_rows(library.search(q), offsets) & exact_top(vectors, q)) for q in clustered(50, seed=1))
+    assert found / (5 * 50) >= 0.9
+
+
+def test_documents_added_after_rebuild_are_searchable(tmp_path, small_ivf):
+    library = Library(str(tmp_path))
+    add(library, "base", clustered(400))
+    generation = library._index_meta["generation"]
+
+    target = clustered(1, seed=5)
+    add(library, "new", np.concatenate([clustered(20, seed=6), target]))
+    assert library._index_meta["generation"] == generation
+
+    doc_key, passage, score = library.search(target[0], top_k=1)[0]
+    assert (doc_key, passage) == ("new", 20)
+    assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_removed_documents_are_masked_until_rebuild(tmp_path, small_ivf):
+    library = Library(str(tmp_path))
+    vectors = clustered(440)
+    add(library, "drop", vectors[400:])
+    add(library, "keep", vectors[:400])
+    assert "drop" in library._index_meta["documents"]
+    generation = library._index_meta["generation"]
+
+    library.remove("drop")
+    assert "drop" not in library
+    assert library._index_meta["generation"] == generation
+    assert not library._index["alive"][library._index["documents"].index("drop")]
+    for query in clustered(10, seed=2):
+        assert all(doc_key == "keep" for doc_key, _, _ in library.search(query, top_k=20))
+
+
+def test_large_changes_trigger_rebuild(tmp_path, small_ivf):
+    library = Library(str(tmp_path))
+    add(library, "base", clustered(300))
+    generation = library._index_meta["generation"]
+    add(library, "big", clustered(200, seed=3))
+    assert library._index_meta["generation"] != generation
+    assert sorted(library._index_meta["documents"]) == ["base", "big"]
+
+
+def test_other_processes_see_changes(tmp_path):
+    writer = Library(str(tmp_path))
+    reader = Library(str(tmp_path))
+    assert len(reader) == 0
+
+    add(writer, "a", clustered(10))
+    assert reader.passage_count() == 10
+    assert reader.passages("a")["passages"][3] == "a passage 3"
+
+    writer.remove("a")
+    assert reader.passage_count() == 0
+    assert reader.passages("a") is None
+
+
+def add_documents(root, prefix, n_docs):
+    models.registry = StubRegistry()
+    library_module.MIN_IVF_PASSAGES = 200
+    library = Library(root)
+    for doc in range(n_docs):
+        add(library, f"{prefix}{doc}", clustered(20, seed=doc))
+
+
+def test_concurrent_processes_keep_every_document(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=add_documents, args=(str(tmp_path), prefix, 40)) for prefix in "ab"]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(120)
+        assert worker.exitcode == 0
+
+    library = Library(str(tmp_path))
+    assert len(library) == 80
+    assert library.passage_count() == 1600
+    generations = os.listdir(tmp_path / "index")
+    assert generations == ([library._index_meta["generation"]] if library._index_meta else [])
+    assert library._index is not None
+
+
+def test_missing_index_generation_falls_back_to_exhaustive_search(tmp_path, small_ivf):
+    library = Library(str(tmp_path))
+    vectors = clustered(400)
+    add(library, "a", vectors)
+    shutil.rmtree(tmp_path / "index" / library._index_meta["generation"])
+
+    reader = Library(str(tmp_path))
+    assert reader._index is None
+    query = clustered(1, seed=7)[0]
+    assert hits_as_rows(reader.search(query), {"a": 0}) == exact_top(vectors, query)
+
+    add(reader, "b", clustered(10, seed=8))
+    assert reader._index is not None
+    assert os.listdir(tmp_path / "index") == [reader._index_meta["generation"]]
+
+
+def test_rejects_embeddings_from_another_model(tmp_path, monkeypatch):
+    library = Library(str(tmp_path))
+    add(library, "a", clustered(10))
+
+    specs = {**models.MODEL_SPECS, "semantic": {**models.MODEL_SPECS["semantic"], "model": "other-encoder"}}
+    monkeypatch.setattr(models, "registry", StubRegistry(specs))
+    with pytest.raises(ValueError, match="rebuild"):
+        add(library, "b", clustered(10))
+
+
+def test_kmeans_assigns_points_to_nearest_centroid():
+    sample = clustered(500)
+    centroids = train_centroids(sample, 8)
+    assert centroids.shape == (8, DIM)
+    np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_array_equal(assign_lists(sample, centroids, batch=64), np.argmax(sample @ centroids.T, axis=1))
+
+
+def test_answer_from_library_reads_best_passage(tmp_path):
+    library = Library(str(tmp_path))
+    passages = ["Transformers use self attention layers", "The dataset has ten thousand images"]
+    embeddings = models.get_model("semantic").encode(passages, normalize_embeddings=True)
+    library.add("paper", "paper.pdf", {"embeddings": embeddings, "passages": passages, "starts": [0, 100]},
+                page_offsets=[0, 50])
+
+    result = answer_from_library("How many images does the dataset have", library)
+    assert result["document"] == "paper.pdf"
+    assert result["passage"] == passages[1]
+    assert result["page"] == 2
+    assert result["answer"] == "The dataset has"
+
+
+def test_answer_from_empty_library(tmp_path):
+    result = answer_from_library("Anything?", Library(str(tmp_path)))
+    assert result["document"] is None
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from benchmarks.stubs import StubTokenizer
+from utils.segmenter import (
+    segment_document, sentence_texts, paragraph_texts, token_counts, heading_at, MAX_UNDOTTED_HEADING_WORDS
+)
+
+
+def headings(text):
+    return segment_document(text)["headings"]
+
+
+def test_splits_sentences_at_terminal_punctuation():
+    text = "Models improve. Do they scale? Yes! Results follow."
+    assert sentence_texts(text, segment_document(text)) == [
+        "Models improve.", "Do they scale?", "Yes!", "Results follow."
+    ]
+
+
+@pytest.mark.parametrize("text", [
+    "As shown by Smith et al. in prior work, models improve.",
+    "See Fig. 3 for the full results table.",
+    "Compared to BERT, i.e. the baseline, it is faster.",
+    "The value increased to 3.5 percent overall.",
+    "J. Smith proposed the method first.",
+    "The loss drops. then it plateaus near zero.",
+])
+def test_does_not_split_after_abbreviations_or_lowercase_continuations(text):
+    assert sentence_texts(text, segment_document(text)) == [text]
+
+
+def test_spans_index_into_the_original_text():
+    text = "  First sentence here.\n\nSecond paragraph starts.   Third one."
+    segments = segment_document(text)
+    for start, end, words in zip(segments["starts"], segments["ends"], segments["words"]):
+        assert text[start:end] == text[start:end].strip()
+        assert len(text[start:end].split()) == words
+
+
+def test_long_sentences_are_windowed():
+    text = " ".join(f"w{i}" for i in range(25)) + "."
+    segments = segment_document(text, max_words=10)
+    assert segments["words"].tolist() == [10, 10, 5]
+    assert " ".join(sentence_texts(text, segments)) == text
+
+
+def test_paragraphs_group_sentences():
+    text = "One. Two.\n\nThree. Four.\n  \nFive."
+    segments = segment_document(text)
+    assert segments["paragraphs"].tolist() == [0, 0, 1, 1, 2]
+    assert paragraph_texts(text, segments) == ["One. Two.", "Three. Four.", "Five."]
+    assert paragraph_texts("", segment_document("")) == []
+
+
+@pytest.mark.parametrize("line", [
+    "Abstract", "INTRODUCTION", "Related Work", "3 Method", "3. Method", "3.1 Training Details",
+    "4.2.1 Ablations", "IV. Results", "12 Conclusion and Future Work",
+])
+def test_recognises_headings(line):
+    assert headings(f"Intro text.\n{line}\nBody text follows.") == [line]
+
+
+@pytest.mark.parametrize("line", [
+    "3 We propose a new method for scalable retrieval of long scientific documents",
+    "2019 The authors released their code",
+    "4 Related Work,",
+    "The results in Table",
+])
+def test_rejects_wrapped_prose_as_headings(line):
+    assert headings(f"Intro text.\n{line}\nBody text follows.") == []
+
+
+def test_undotted_heading_word_limit():
+    words = " ".join(["Word"] * MAX_UNDOTTED_HEADING_WORDS)
+    assert headings(f"2 {words}\n") == [f"2 {words}"]
+    assert headings(f"2 {words} Extra\n") == []
+
+
+def test_headings_start_their_own_segment_and_are_found_by_position():
+    text = "Abstract\nWe study graphs.\n\n1 Introduction\nGraphs matter. They are everywhere."
+    segments = segment_document(text)
+    assert sentence_texts(text, segments) == [
+        "Abstract", "We study graphs.", "1 Introduction", "Graphs matter.", "They are everywhere."
+    ]
+    assert heading_at(segments, 0) == "Abstract"
+    assert heading_at(segments, text.index("everywhere")) == "1 Introduction"
+    assert heading_at(segment_document("No headings. Here."), 5) is None
+
+
+def test_pages_follow_page_offsets():
+    text = "Page one text. More on one. Page two text."
+    offsets = [0, text.index("Page two")]
+    assert segment_document(text, offsets)["pages"].tolist() == [1, 1, 2]
+    assert "pages" not in segment_document(text)
+
+
+def test_token_counts_are_cached_per_tokenizer():
+    text = "Three words here. And four words here."
+    segments = segment_document(text)
+    counts = token_counts(text, segments, StubTokenizer())
+    np.testing.assert_array_equal(counts, [3, 4])
+    assert token_counts(text, segments, StubTokenizer()) is counts
+    assert token_counts("", segment_document(""), StubTokenizer()).tolist() == []
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from utils import sessions
+from utils.sessions import SessionStore, footprint
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions, "time", clock)
+    return clock
+
+
+def block(kib):
+    return np.zeros(kib * 1024, dtype=np.uint8)
+
+
+def stored(store, session_id):
+    return list(store._sessions.get(session_id, {"artifacts": {}})["artifacts"])
+
+
+def test_get_loads_once_and_caches(clock):
+    store = SessionStore()
+    calls = []
+
+    def load():
+        calls.append(1)
+        return block(1)
+
+    first = store.get("a", "x", load)
+    second = store.get("a", "x", load)
+    assert first is second
+    assert len(calls) == 1
+
+
+def test_none_is_not_stored(clock):
+    store = SessionStore()
+    assert store.get("a", "x", lambda: None) is None
+    assert stored(store, "a") == []
+    assert store.get("a", "x", lambda: block(1)) is not None
+    assert stored(store, "a") == ["x"]
+
+
+def test_oversized_value_is_returned_but_not_stored(clock):
+    store = SessionStore(max_session_bytes=4 * 1024)
+    value = store.get("a", "big", lambda: block(8))
+    assert value.nbytes == 8 * 1024
+    assert stored(store, "a") == []
+
+
+def test_session_budget_evicts_least_recently_used_artifact(clock):
+    store = SessionStore(max_session_bytes=10 * 1024)
+    store.get("a", "x", lambda: block(4))
+    store.get("a", "y", lambda: block(4))
+    store.get("a", "x", lambda: block(4))
+    store.get("a", "z", lambda: block(4))
+    assert stored(store, "a") == ["x", "z"]
+
+
+def test_total_budget_evicts_oldest_other_session(clock):
+    store = SessionStore(max_session_bytes=8 * 1024, max_total_bytes=10 * 1024)
+    store.get("a", "x", lambda: block(4))
+    clock.now += 1
+    store.get("b", "x", lambda: block(4))
+    clock.now += 1
+    store.get("c", "x", lambda: block(4))
+    assert stored(store, "a") == []
+    assert stored(store, "b") == ["x"]
+    assert stored(store, "c") == ["x"]
+    assert store.total_bytes() <= 10 * 1024
+
+
+def test_total_budget_never_evicts_the_requesting_session(clock):
+    store = SessionStore(max_session_bytes=8 * 1024, max_total_bytes=4 * 1024)
+    store.get("a", "x", lambda: block(4))
+    store.get("b", "x", lambda: block(6))
+    assert stored(store, "a") == []
+    assert stored(store, "b") == ["x"]
+
+
+def test_idle_sessions_are_evicted(clock):
+    store = SessionStore(idle_seconds=60)
+    store.get("a", "x", lambda: block(1))
+    store.get("b", "x", lambda: block(1))
+    clock.now += 30
+    store.get("b", "y", lambda: block(1))
+    assert stored(store, "a") == ["x"]
+    clock.now += 45
+    store.get("b", "z", lambda: block(1))
+    assert stored(store, "a") == []
+    assert stored(store, "b") == ["x", "y", "z"]
+
+
+def test_footprint_excludes_memmaps(tmp_path):
+    path = tmp_path / "vectors.npy"
+    np.save(path, np.zeros((256, 64), dtype=np.float32))
+    mapped = np.load(path, mmap_mode="r")
+    in_memory = np.zeros((256, 64), dtype=np.float32)
+
+    assert footprint(mapped) == 0
+    assert footprint(in_memory) == in_memory.nbytes
+    artifact = {"vectors": mapped, "ids": in_memory}
+    assert in_memory.nbytes <= footprint(artifact) < in_memory.nbytes + 4096
+
+
+def test_footprint_counts_shared_values_once():
+    array = block(4)
+    assert footprint([array, array]) < 2 * array.nbytes
+
+
+def test_drop_releases_session(clock):
+    store = SessionStore()
+    store.get("a", "x", lambda: block(4))
+    store.drop("a")
+    assert store.total_bytes() == 0
+    assert store.usage() == []
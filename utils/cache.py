@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils.metrics import count
+
+CACHE_DIR = os.environ.get(
+    "NEUROSCHOLAR_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "neuroscholar")
+)
+MAX_CACHE_BYTES = int(os.environ.get("NEUROSCHOLAR_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+
+def document_key(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def artifact_name(kind, *tags):
+    if not tags:
+        return kind
+    digest = hashlib.sha256("|".join(map(str, tags)).encode("utf-8")).hexdigest()[:12]
+    return f"{kind}-{digest}"
+
+
+def _atomic_write(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def _file_lock(path):
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class DocumentCache:
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size = None
+        os.makedirs(root, exist_ok=True)
+
+    def _doc_dir(self, doc_key):
+        return os.path.join(self.root, doc_key)
+
+    def _touch(self, doc_key):
+        try:
+            os.utime(self._doc_dir(doc_key))
+        except OSError:
+            pass
+
+    def has(self, doc_key, name):
+        return os.path.exists(os.path.join(self._doc_dir(doc_key), name))
+
+    def get(self, doc_key, name, default=None):
+        path = os.path.join(self._doc_dir(doc_key), name)
+        if not os.path.exists(path):
+            count("artifact_cache", result="miss")
+            return default
+
+        try:
+            if name.endswith(".npy"):
+                value = np.load(path, mmap_mode="r")
+            elif name.endswith(".json"):
+                with open(path, encoding="utf-8") as f:
+                    value = json.load(f)
+            elif name.endswith(".txt"):
+                with open(path, encoding="utf-8") as f:
+                    value = f.read()
+            else:
+                with open(path, "rb") as f:
+                    value = pickle.load(f)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            return default
+
+        count("artifact_cache", result="hit")
+        self._touch(doc_key)
+        return value
+
+    def put(self, doc_key, name, value):
+        doc_dir = self._doc_dir(doc_key)
+        os.makedirs(doc_dir, exist_ok=True)
+        path = os.path.join(doc_dir, name)
+
+        if name.endswith(".npy"):
+            _atomic_write(path, lambda f: np.save(f, np.asarray(value)))
+        elif name.endswith(".json"):
+            _atomic_write(path, lambda f: f.write(json.dumps(value).encode("utf-8")))
+        elif name.endswith(".txt"):
+            _atomic_write(path, lambda f: f.write(value.encode("utf-8")))
+        else:
+            _atomic_write(path, lambda f: pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+        self._stored(doc_key, path)
+        return value
+
+    def spool(self, doc_key, name, fill):
+        doc_dir = self._doc_dir(doc_key)
+        os.makedirs(doc_dir, exist_ok=True)
+        path = os.path.join(doc_dir, name)
+
+        result = []
+        _atomic_write(path, lambda f: result.append(fill(lambda chunk: f.write(chunk.encode("utf-8")))))
+        self._stored(doc_key, path)
+        return result[0]
+
+    def _stored(self, doc_key, path):
+        self._touch(doc_key)
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def get_index(self, doc_key, name):
+        fields = self.get(doc_key, f"{name}.pkl")
+        if fields is None:
+            return None
+
+        index = dict(fields)
+        for field in index.pop("_arrays", []):
+            array = self.get(doc_key, f"{name}.{field}.npy")
+            if array is None:
+                return None
+            index[field] = array
+        return index
+
+    def put_index(self, doc_key, name, index):
+        arrays = [field for field, value in index.items() if isinstance(value, np.ndarray)]
+        for field in arrays:
+            self.put(doc_key, f"{name}.{field}.npy", index[field])
+
+        fields = {field: value for field, value in index.items() if field not in arrays}
+        fields["_arrays"] = arrays
+        self.put(doc_key, f"{name}.pkl", fields)
+        return index
+
+    def get_or_compute(self, doc_key, name, compute):
+        value = self.get(doc_key, name)
+        if value is None:
+            value = self.put(doc_key, name, compute())
+        return value
+
+    def size(self):
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        entries = []
+        for doc_key in os.listdir(self.root):
+            doc_dir = self._doc_dir(doc_key)
+            if not os.path.isdir(doc_dir):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(doc_dir) if entry.is_file())
+            entries.append((os.path.getmtime(doc_dir), doc_key, size))
+        return entries
+
+    def evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, doc_key, size in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._doc_dir(doc_key), ignore_errors=True)
+            total -= size
+        self._size = total
+
+    def clear(self):
+        for doc_key in os.listdir(self.root):
+            shutil.rmtree(self._doc_dir(doc_key), ignore_errors=True)
+        self._size = 0
+
+
+_default_cache = None
+
+
+def get_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DocumentCache()
+    return _default_cache
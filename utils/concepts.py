@@ -0,0 +1,212 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.linalg import solve_triangular
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.utils import murmurhash3_32
+
+from utils.cache import _atomic_write, _file_lock
+
+CONCEPT_DIR = os.environ.get(
+    "NEUROSCHOLAR_CONCEPT_DIR",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "neuroscholar", "concepts")
+)
+CONCEPT_MODEL_VERSION = 1
+N_FEATURES = 2 ** 18
+SKETCH_RANK = 16
+N_COMPONENTS = 3
+RANDOM_STATE = 0
+SAVE_INTERVAL_SECONDS = float(os.environ.get("NEUROSCHOLAR_CONCEPT_SAVE_INTERVAL", 30))
+
+
+def term_features(terms, n_features=N_FEATURES):
+    return np.array([murmurhash3_32(term, positive=True) % n_features for term in terms], dtype=np.int64)
+
+
+def count_terms(windows):
+    vectorizer = CountVectorizer(stop_words="english")
+    try:
+        counts = vectorizer.fit_transform(windows).tocsr()
+    except ValueError:
+        return None, np.array([], dtype=object)
+    return counts, vectorizer.get_feature_names_out()
+
+
+class ConceptModel:
+    def __init__(self, root=CONCEPT_DIR, n_features=N_FEATURES, sketch_rank=SKETCH_RANK, random_state=RANDOM_STATE,
+                 save_interval=SAVE_INTERVAL_SECONDS):
+        self.root = root
+        self.n_features = n_features
+        self.sketch_rank = sketch_rank
+        self.random_state = random_state
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._test_matrix = None
+        self._test_gram = None
+        self._coordinates = None
+        self._pending = []
+        self._saved_at = float("-inf")
+        self._save_timer = None
+
+        os.makedirs(root, exist_ok=True)
+        with _file_lock(os.path.join(root, "lock")):
+            self.n_docs, self.documents, self.doc_freq, self.sketch = self._read()
+
+    def _read(self):
+        try:
+            with open(os.path.join(self.root, "state.json"), encoding="utf-8") as f:
+                state = json.load(f)
+            if (state["version"], state["n_features"], state["sketch_rank"]) == (
+                CONCEPT_MODEL_VERSION, self.n_features, self.sketch_rank
+            ):
+                return (
+                    state["n_docs"],
+                    set(state["documents"]),
+                    np.load(os.path.join(self.root, "doc_freq.npy")),
+                    np.load(os.path.join(self.root, "sketch.npy")),
+                )
+        except (OSError, ValueError, KeyError):
+            pass
+        return (
+            0,
+            set(),
+            np.zeros(self.n_features, dtype=np.int32),
+            np.zeros((self.n_features, self.sketch_rank), dtype=np.float32),
+        )
+
+    def _omega(self):
+        if self._test_matrix is None:
+            rng = np.random.default_rng(self.random_state)
+            self._test_matrix = rng.standard_normal((self.n_features, self.sketch_rank), dtype=np.float32)
+            self._test_gram = (self._test_matrix.T @ self._test_matrix).astype(np.float64)
+        return self._test_matrix
+
+    def _hashed(self, counts, terms):
+        features = term_features(terms, self.n_features)
+        projection = sparse.csr_matrix(
+            (np.ones(len(terms), dtype=np.float32), (np.arange(len(terms)), features)),
+            shape=(len(terms), self.n_features)
+        )
+        X = (counts @ projection).tocsr().astype(np.float32)
+        X.data = 1 + np.log(X.data)
+        return X
+
+    def partial_fit(self, doc_key, windows, counts=None, terms=None):
+        if doc_key in self.documents:
+            return False
+        if counts is None:
+            counts, terms = count_terms(windows)
+        if counts is None:
+            return False
+
+        X = self._hashed(counts, terms)
+        touched = np.unique(X.indices)
+        update = (X[:, touched].T @ (X @ self._omega())).astype(np.float32)
+
+        with self._lock:
+            if doc_key in self.documents:
+                return False
+            self.sketch[touched] += update
+            self.doc_freq[touched] += 1
+            self.n_docs += 1
+            self.documents.add(doc_key)
+            self._pending.append((doc_key, touched, update))
+            self._coordinates = None
+        return True
+
+    def idf(self, features):
+        return np.log((1 + self.n_docs) / (1 + self.doc_freq[features])) + 1
+
+    def term_coordinates(self):
+        with self._lock:
+            if self._coordinates is not None:
+                return self._coordinates
+
+            omega = self._omega()
+            active = np.flatnonzero(self.doc_freq)
+            sketch = self.sketch[active]
+            shift = np.sqrt(self.n_features) * np.finfo(np.float32).eps * max(np.linalg.norm(sketch), 1e-9)
+            shifted = sketch + np.float32(shift) * omega[active]
+            inactive_gram = self._test_gram - (omega[active].T @ omega[active]).astype(np.float64)
+            core = (omega[active].T @ shifted).astype(np.float64) + shift * inactive_gram
+            cholesky = np.linalg.cholesky((core + core.T) / 2)
+
+            weighted = shifted * self.idf(active)[:, None].astype(np.float32)
+            B = solve_triangular(cholesky, weighted.T, lower=True).T
+            U, S, _ = np.linalg.svd(B, full_matrices=False)
+            scale = np.sqrt(np.maximum(S[:N_COMPONENTS] ** 2 - shift, 0))
+
+            self._coordinates = np.zeros((self.n_features, N_COMPONENTS), dtype=np.float32)
+            self._coordinates[active, :len(scale)] = U[:, :N_COMPONENTS] * scale
+            return self._coordinates
+
+    def transform(self, windows, max_terms):
+        counts, terms = count_terms(windows)
+        if counts is None:
+            return sparse.csr_matrix((len(windows), 0)), terms, np.zeros((0, N_COMPONENTS))
+
+        features = term_features(terms, self.n_features)
+        idf = self.idf(features)
+        scores = (1 + np.log(np.asarray(counts.sum(axis=0)).ravel())) * idf
+        keep = np.sort(np.argsort(-scores, kind="stable")[:max_terms])
+
+        X = counts[:, keep].astype(np.float32)
+        X.data = 1 + np.log(X.data)
+        X = sparse.csr_matrix(X.multiply(idf[keep][None, :]))
+        return X, terms[keep], self.term_coordinates()[features[keep]]
+
+    def save(self, force=False):
+        with self._lock:
+            if not self._pending:
+                return False
+            wait = self._saved_at + self.save_interval - time.monotonic()
+            if not force and wait > 0:
+                if self._save_timer is None:
+                    self._save_timer = threading.Timer(wait, self.save, kwargs={"force": True})
+                    self._save_timer.daemon = True
+                    self._save_timer.start()
+                return False
+
+            with _file_lock(os.path.join(self.root, "lock")):
+                n_docs, documents, doc_freq, sketch = self._read()
+                for doc_key, touched, update in self._pending:
+                    if doc_key not in documents:
+                        sketch[touched] += update
+                        doc_freq[touched] += 1
+                        n_docs += 1
+                        documents.add(doc_key)
+
+                _atomic_write(os.path.join(self.root, "doc_freq.npy"), lambda f: np.save(f, doc_freq))
+                _atomic_write(os.path.join(self.root, "sketch.npy"), lambda f: np.save(f, sketch))
+                _atomic_write(os.path.join(self.root, "state.json"), lambda f: f.write(json.dumps({
+                    "version": CONCEPT_MODEL_VERSION,
+                    "n_features": self.n_features,
+                    "sketch_rank": self.sketch_rank,
+                    "n_docs": n_docs,
+                    "documents": sorted(documents),
+                }).encode("utf-8")))
+
+            self.n_docs, self.documents, self.doc_freq, self.sketch = n_docs, documents, doc_freq, sketch
+            self._pending = []
+            self._saved_at = time.monotonic()
+            self._coordinates = None
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            return True
+
+
+_default_model = None
+
+
+def get_concept_model():
+    global _default_model
+    if _default_model is None:
+        _default_model = ConceptModel()
+        atexit.register(_default_model.save, force=True)
+    return _default_model
@@ -0,0 +1,173 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from utils.models import get_model
+
+INFERENCE_SERVER = os.environ.get("NEUROSCHOLAR_INFERENCE_SERVER", "1") != "0"
+MAX_WAIT_SECONDS = float(os.environ.get("NEUROSCHOLAR_BATCH_WAIT", 0.01))
+MAX_QUEUE_SIZE = int(os.environ.get("NEUROSCHOLAR_MAX_QUEUE", 1024))
+REQUEST_TIMEOUT = float(os.environ.get("NEUROSCHOLAR_REQUEST_TIMEOUT", 300))
+
+MAX_BATCH_SIZES = {
+    "semantic": 64,
+    "qa": 16,
+    "summarizer": 4,
+    "text_gen": 4,
+}
+
+
+class InferenceOverloaded(RuntimeError):
+    pass
+
+
+def call_model(name, model, inputs, **kwargs):
+    if name == "semantic":
+        return list(model.encode(inputs, batch_size=len(inputs), **kwargs))
+
+    if name == "qa":
+        outputs = model(
+            question=[q for q, _ in inputs], context=[c for _, c in inputs], batch_size=len(inputs), **kwargs
+        )
+        return [outputs] if isinstance(outputs, dict) else list(outputs)
+
+    if name == "text_gen" and model.tokenizer.pad_token is None:
+        model.tokenizer.pad_token = model.tokenizer.eos_token
+        model.tokenizer.padding_side = "left"
+
+    return list(model(inputs, batch_size=len(inputs), **kwargs))
+
+
+def run_model(name, inputs, **kwargs):
+    return call_model(name, get_model(name), inputs, **kwargs)
+
+
+class BatchWorker:
+    def __init__(self, name, kwargs, max_batch_size, max_wait=MAX_WAIT_SECONDS, max_queue=MAX_QUEUE_SIZE):
+        self.name = name
+        self.kwargs = kwargs
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue(maxsize=max_queue)
+        self.batches = 0
+        self.items = 0
+        self.busy_since = None
+        self._thread = threading.Thread(target=self._loop, name=f"inference-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item, timeout=REQUEST_TIMEOUT):
+        future = Future()
+        try:
+            self.requests.put((item, future), timeout=timeout)
+        except queue.Full:
+            raise InferenceOverloaded(f"{self.name} inference queue is full")
+        return future
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        started = time.perf_counter()
+        running = []
+        for item, future in batch:
+            if future.set_running_or_notify_cancel():
+                future.started = started
+                running.append((item, future))
+        return running
+
+    def result(self, future, timeout=REQUEST_TIMEOUT):
+        while True:
+            if timeout is None:
+                return future.result()
+            started = getattr(future, "started", None) or self.busy_since or time.perf_counter()
+            remaining = started + timeout - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutError(f"{self.name} inference did not finish within {timeout:g}s")
+            try:
+                return future.result(remaining)
+            except FutureTimeoutError:
+                continue
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+
+            self.busy_since = batch[0][1].started
+            try:
+                outputs = run_model(self.name, [item for item, _ in batch], **self.kwargs)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            finally:
+                self.busy_since = None
+
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), output in zip(batch, outputs):
+                future.set_result(output)
+
+
+class InferenceServer:
+    def __init__(self, max_batch_sizes=None):
+        self.max_batch_sizes = dict(max_batch_sizes or MAX_BATCH_SIZES)
+        self._workers = {}
+        self._lock = threading.Lock()
+
+    def _worker(self, name, kwargs):
+        key = (name, tuple(sorted(kwargs.items())))
+        with self._lock:
+            if key not in self._workers:
+                self._workers[key] = BatchWorker(name, kwargs, self.max_batch_sizes.get(name, 8))
+            return self._workers[key]
+
+    def __call__(self, name, inputs, timeout=REQUEST_TIMEOUT, **kwargs):
+        worker = self._worker(name, kwargs)
+        futures = []
+        try:
+            for item in inputs:
+                futures.append(worker.submit(item, timeout))
+            return [worker.result(future, timeout) for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def stats(self):
+        with self._lock:
+            workers = list(self._workers.items())
+        return [
+            {
+                "model": name,
+                "queued": worker.requests.qsize(),
+                "batches": worker.batches,
+                "avg_batch": worker.items / worker.batches if worker.batches else 0.0,
+            }
+            for (name, _), worker in workers
+        ]
+
+
+server = InferenceServer()
+
+
+def infer(name, inputs, timeout=REQUEST_TIMEOUT, **kwargs):
+    inputs = list(inputs)
+    if not inputs:
+        return []
+    if INFERENCE_SERVER:
+        return server(name, inputs, timeout, **kwargs)
+
+    batch_size = MAX_BATCH_SIZES.get(name, 8)
+    outputs = []
+    for start in range(0, len(inputs), batch_size):
+        outputs.extend(run_model(name, inputs[start:start + batch_size], **kwargs))
+    return outputs
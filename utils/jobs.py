@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+JOB_WORKERS = int(os.environ.get("NEUROSCHOLAR_JOB_WORKERS", 4))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="ingest")
+        return _executor
+
+
+class Job:
+    def __init__(self, name, executor=None):
+        self.name = name
+        self.executor = executor or get_executor()
+        self.stages = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, fn, after=()):
+        stage = {"status": PENDING, "progress": 0.0, "partial": None, "error": None, "seconds": None}
+        future = Future()
+        deps = [self._futures[dep] for dep in after]
+        started = []
+
+        with self._lock:
+            self.stages[name] = stage
+            self._futures[name] = future
+
+        def start(_=None):
+            if not all(dep.done() for dep in deps):
+                return
+            with self._lock:
+                if started:
+                    return
+                started.append(True)
+
+            failed = [dep_name for dep_name, dep in zip(after, deps) if dep.exception() is not None]
+            if failed:
+                self._finish(name, future, error=RuntimeError(f"{', '.join(failed)} failed"))
+            else:
+                self.executor.submit(self._run, name, fn, [dep.result() for dep in deps], future)
+
+        if not deps:
+            start()
+        for dep in deps:
+            dep.add_done_callback(start)
+        return future
+
+    def _run(self, name, fn, args, future):
+        stage = self.stages[name]
+        stage["status"] = RUNNING
+        started = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception as e:
+            stage["seconds"] = time.perf_counter() - started
+            self._finish(name, future, error=e)
+        else:
+            stage["seconds"] = time.perf_counter() - started
+            self._finish(name, future, result=result)
+
+    def _finish(self, name, future, result=None, error=None):
+        stage = self.stages[name]
+        if error is not None:
+            stage["status"] = FAILED
+            stage["error"] = str(error)
+            future.set_exception(error)
+        else:
+            stage["status"] = DONE
+            stage["progress"] = 1.0
+            future.set_result(result)
+
+    def report(self, name, progress=None, partial=None):
+        stage = self.stages[name]
+        if progress is not None:
+            stage["progress"] = min(max(progress, 0.0), 1.0)
+        if partial is not None:
+            stage["partial"] = partial
+
+    def status(self, name):
+        return self.stages[name]["status"]
+
+    def ready(self, name):
+        return name in self.stages and self.stages[name]["status"] == DONE
+
+    def result(self, name, timeout=None):
+        return self._futures[name].result(timeout)
+
+    def finished(self):
+        return all(stage["status"] in (DONE, FAILED) for stage in self.stages.values())
+
+    def settled(self):
+        return frozenset(name for name, stage in self.stages.items() if stage["status"] in (DONE, FAILED))
+
+    def snapshot(self):
+        return [{"name": name, **stage} for name, stage in self.stages.items()]
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
+
+from utils.segmenter import segment_document, sentence_texts, paragraph_texts
+
+MAX_TERMS = 50
+MIN_EDGE_WEIGHT = 0.1
+MAX_RENDER_EDGES = 500
+MAX_RENDER_NODES = 300
+RANDOM_STATE = 0
+WINDOWS = ("sentence", "paragraph")
+
+
+def split_windows(text, window="sentence", segments=None):
+    if segments is None:
+        segments = segment_document(text)
+    if window == "paragraph":
+        return paragraph_texts(text, segments)
+    return sentence_texts(text, segments)
+
+
+def co_occurrence_edges(X, min_weight=MIN_EDGE_WEIGHT):
+    occurs = (X > 0).astype(np.float32)
+    counts = (occurs.T @ occurs).tocsr()
+
+    doc_freq = counts.diagonal()
+    upper = sparse.triu(counts, k=1).tocoo()
+    weights = upper.data / np.sqrt(doc_freq[upper.row] * doc_freq[upper.col])
+
+    keep = weights > min_weight
+    return pd.DataFrame({
+        'source': upper.row[keep],
+        'target': upper.col[keep],
+        'value': weights[keep] * 10
+    })
+
+
+def build_knowledge_graph(text, max_terms=MAX_TERMS, window="sentence", min_weight=MIN_EDGE_WEIGHT,
+                          random_state=RANDOM_STATE, segments=None, concept_model=None):
+    rng = np.random.default_rng(random_state)
+    windows = split_windows(text, window, segments) or [text]
+
+    if concept_model is not None:
+        X, terms, coords = concept_model.transform(windows, max_terms)
+        if len(terms) and not np.abs(coords).any():
+            coords = rng.random((len(terms), 3))
+    else:
+        vectorizer = TfidfVectorizer(max_features=max_terms, stop_words='english')
+        X = vectorizer.fit_transform(windows)
+        terms = vectorizer.get_feature_names_out()
+
+        if X.shape[0] > 3:
+            svd = TruncatedSVD(n_components=3, random_state=random_state)
+            coords = svd.fit_transform(X.T)
+        else:
+            coords = rng.random((len(terms), 3))
+
+    weights = np.asarray(X.sum(axis=0)).flatten()
+    nodes = pd.DataFrame({
+        'term': terms,
+        'x': coords[:, 0],
+        'y': coords[:, 1],
+        'z': coords[:, 2],
+        'size': weights / max(weights.max(), 1e-9) * 50,
+        'color_r': rng.integers(50, 255, len(terms)),
+        'color_g': rng.integers(50, 255, len(terms)),
+        'color_b': rng.integers(50, 255, len(terms))
+    })
+
+    return nodes, co_occurrence_edges(X, min_weight)
+
+
+def strongest_edges(edges, max_edges=MAX_RENDER_EDGES):
+    if len(edges) <= max_edges:
+        return edges
+    return edges.nlargest(max_edges, 'value').reset_index(drop=True)
+
+
+def level_of_detail(nodes, edges, max_nodes=MAX_RENDER_NODES):
+    if len(nodes) <= max_nodes:
+        return nodes, edges
+
+    keep = np.sort(np.argsort(-nodes['size'].to_numpy(), kind='stable')[:max_nodes])
+    remap = np.full(len(nodes), -1)
+    remap[keep] = np.arange(len(keep))
+
+    source = remap[edges['source'].to_numpy(dtype=int)]
+    target = remap[edges['target'].to_numpy(dtype=int)]
+    mask = (source >= 0) & (target >= 0)
+
+    return nodes.iloc[keep].reset_index(drop=True), pd.DataFrame({
+        'source': source[mask],
+        'target': target[mask],
+        'value': edges['value'].to_numpy()[mask]
+    })
+
+
+def edge_segments(nodes, edges):
+    xyz = nodes[['x', 'y', 'z']].to_numpy(dtype=float)
+    segments = np.full((len(edges) * 3, 3), np.nan)
+    segments[0::3] = xyz[edges['source'].to_numpy(dtype=int)]
+    segments[1::3] = xyz[edges['target'].to_numpy(dtype=int)]
+    return segments
+
+
+def related_terms(nodes, edges, term_id, n=2):
+    source = edges['source'].to_numpy(dtype=int)
+    target = edges['target'].to_numpy(dtype=int)
+    touching = (source == term_id) | (target == term_id)
+
+    order = np.argsort(-edges['value'].to_numpy()[touching], kind='stable')
+    neighbours = np.where(source[touching] == term_id, target[touching], source[touching])[order]
+
+    if len(neighbours) < n:
+        by_size = np.argsort(-nodes['size'].to_numpy(), kind='stable')
+        extra = [i for i in by_size if i != term_id and i not in neighbours]
+        neighbours = np.concatenate([neighbours, extra]).astype(int)
+
+    return nodes['term'].to_numpy()[neighbours[:n]]
@@ -0,0 +1,381 @@
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils.cache import _atomic_write, _file_lock
+from utils.inference import infer
+from utils.metrics import timed
+from utils.models import model_tag
+from utils.pdf_reader import page_at
+from utils.qa_engine import encode_texts
+
+LIBRARY_DIR = os.environ.get(
+    "NEUROSCHOLAR_LIBRARY_DIR",
+    os.path.join(os.path.expanduser("~"), ".local", "share", "neuroscholar", "library")
+)
+MIN_IVF_PASSAGES = 4096
+LISTS_PER_SQRT = 4
+MAX_LISTS = 4096
+N_PROBE = 16
+TRAIN_SAMPLES_PER_LIST = 32
+KMEANS_ITERATIONS = 10
+REBUILD_FRACTION = 0.2
+ASSIGN_BATCH = 16384
+TOP_K_LIBRARY = 5
+RANDOM_STATE = 0
+
+
+def _read_json(path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, value):
+    _atomic_write(path, lambda f: f.write(json.dumps(value).encode("utf-8")))
+
+
+def _write_npy(path, array):
+    _atomic_write(path, lambda f: np.save(f, array))
+
+
+def _top_k(scores, top_k):
+    k = min(top_k, len(scores))
+    if k == 0:
+        return np.zeros(0, dtype=int)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def train_centroids(sample, n_lists, iterations=KMEANS_ITERATIONS, random_state=RANDOM_STATE):
+    rng = np.random.default_rng(random_state)
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].astype(np.float32)
+
+    for _ in range(iterations):
+        lists = assign_lists(sample, centroids)
+        order = np.argsort(lists, kind="stable")
+        sizes = np.bincount(lists, minlength=n_lists)
+        empty = sizes == 0
+
+        sums = np.zeros_like(centroids)
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        sums[~empty] = np.add.reduceat(sample[order], starts[~empty], axis=0)
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-9)
+    return centroids
+
+
+def assign_lists(vectors, centroids, batch=ASSIGN_BATCH):
+    lists = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), batch):
+        lists[start:start + batch] = np.argmax(vectors[start:start + batch] @ centroids.T, axis=1)
+    return lists
+
+
+class Library:
+    def __init__(self, root=LIBRARY_DIR):
+        self.root = root
+        self._lock = threading.RLock()
+        self._manifest_mtime = None
+        os.makedirs(os.path.join(root, "docs"), exist_ok=True)
+        os.makedirs(os.path.join(root, "index"), exist_ok=True)
+        self._reload()
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def _doc_path(self, doc_key, name):
+        return self._path("docs", doc_key, name)
+
+    def _reload(self):
+        manifest_path = self._path("library.json")
+        manifest = _read_json(manifest_path, {"model": None, "documents": {}, "index": None})
+        self._manifest_mtime = os.path.getmtime(manifest_path) if os.path.exists(manifest_path) else None
+
+        self.model = manifest["model"]
+        self.documents = manifest["documents"]
+        self._index_meta = manifest["index"]
+        self._segments = {}
+        self._passages = {}
+        self._index = None
+
+        if self._index_meta:
+            index_dir = self._path("index", self._index_meta["generation"])
+            try:
+                self._index = {
+                    "centroids": np.load(os.path.join(index_dir, "centroids.npy")),
+                    "vectors": np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode="r"),
+                    "offsets": np.load(os.path.join(index_dir, "offsets.npy")),
+                    "doc_rows": np.load(os.path.join(index_dir, "doc_rows.npy"), mmap_mode="r"),
+                    "passage_ids": np.load(os.path.join(index_dir, "passage_ids.npy"), mmap_mode="r"),
+                    "documents": self._index_meta["documents"],
+                    "alive": np.array([key in self.documents for key in self._index_meta["documents"]], dtype=bool),
+                }
+            except (OSError, ValueError):
+                self._index = None
+
+    @contextmanager
+    def _writing(self):
+        with self._lock, _file_lock(self._path("lock")):
+            self._reload()
+            yield
+
+    def _refresh(self):
+        manifest_path = self._path("library.json")
+        mtime = os.path.getmtime(manifest_path) if os.path.exists(manifest_path) else None
+        if mtime != self._manifest_mtime:
+            self._reload()
+
+    def _save_manifest(self):
+        _write_json(self._path("library.json"), {
+            "model": self.model,
+            "documents": self.documents,
+            "index": self._index_meta,
+        })
+        self._manifest_mtime = os.path.getmtime(self._path("library.json"))
+
+    def _segment(self, doc_key):
+        if doc_key not in self._segments:
+            self._segments[doc_key] = np.load(self._doc_path(doc_key, "embeddings.npy"), mmap_mode="r")
+        return self._segments[doc_key]
+
+    def passages(self, doc_key):
+        self._refresh()
+        if doc_key not in self._passages:
+            self._passages[doc_key] = _read_json(self._doc_path(doc_key, "passages.json"), None)
+        return self._passages[doc_key]
+
+    def __contains__(self, doc_key):
+        self._refresh()
+        return doc_key in self.documents
+
+    def __len__(self):
+        self._refresh()
+        return len(self.documents)
+
+    def passage_count(self):
+        self._refresh()
+        return sum(doc["passages"] for doc in self.documents.values())
+
+    def add(self, doc_key, name, passage_index, page_offsets=None):
+        tag = model_tag("semantic")
+        embeddings = np.ascontiguousarray(passage_index["embeddings"], dtype=np.float32)
+        starts = [int(start) for start in passage_index.get("starts", [])]
+        pages = [page_at(page_offsets, start) for start in starts] if page_offsets else None
+
+        with self._writing():
+            if doc_key in self.documents:
+                return
+            if self.documents and self.model != tag:
+                raise ValueError(f"Library was built with {self.model}, not {tag}; rebuild it to switch models")
+
+            os.makedirs(self._path("docs", doc_key), exist_ok=True)
+            _write_npy(self._doc_path(doc_key, "embeddings.npy"), embeddings)
+            _write_json(self._doc_path(doc_key, "passages.json"), {
+                "passages": list(passage_index["passages"]),
+                "pages": pages,
+            })
+
+            self._segments.pop(doc_key, None)
+            self._passages.pop(doc_key, None)
+            self.model = tag
+            self.documents[doc_key] = {"name": name, "passages": len(embeddings), "added": time.time()}
+            self._save_manifest()
+            self._maybe_rebuild()
+
+    def remove(self, doc_key):
+        with self._writing():
+            if self.documents.pop(doc_key, None) is None:
+                return
+            if self._index is not None and doc_key in self._index["documents"]:
+                self._index["alive"][self._index["documents"].index(doc_key)] = False
+
+            self._segments.pop(doc_key, None)
+            self._passages.pop(doc_key, None)
+            self._save_manifest()
+            shutil.rmtree(self._path("docs", doc_key), ignore_errors=True)
+            self._maybe_rebuild()
+
+    def _delta_documents(self):
+        indexed = set(self._index["documents"]) if self._index is not None else set()
+        return [key for key in self.documents if key not in indexed]
+
+    def _maybe_rebuild(self):
+        total = self.passage_count()
+        if total < MIN_IVF_PASSAGES:
+            if self._index_meta is not None:
+                self._rebuild()
+            return
+
+        if self._index is None:
+            self._rebuild()
+            return
+
+        counts = self._index_meta["counts"]
+        stale = sum(count for count, live in zip(counts, self._index["alive"]) if not live)
+        delta = sum(self.documents[key]["passages"] for key in self._delta_documents())
+        if stale + delta > REBUILD_FRACTION * max(sum(counts), 1):
+            self._rebuild()
+
+    def rebuild(self):
+        with self._writing():
+            self._rebuild()
+
+    def _rebuild(self):
+        keys = [key for key in self.documents if self.documents[key]["passages"]]
+        counts = [self.documents[key]["passages"] for key in keys]
+        total = sum(counts)
+
+        if total < MIN_IVF_PASSAGES:
+            self._index_meta = None
+        else:
+            with timed("library.rebuild", documents=len(keys), passages=total) as sizes:
+                self._index_meta = self._build_index(keys, counts, total)
+                sizes["lists"] = self._index_meta["lists"]
+
+        self._save_manifest()
+        self._reload()
+        current = self._index_meta["generation"] if self._index_meta else None
+        for generation in os.listdir(self._path("index")):
+            if generation != current:
+                shutil.rmtree(self._path("index", generation), ignore_errors=True)
+
+    def _build_index(self, keys, counts, total):
+        rng = np.random.default_rng(RANDOM_STATE)
+        n_lists = int(min(MAX_LISTS, max(1, LISTS_PER_SQRT * np.sqrt(total))))
+        sample_rate = min(1.0, n_lists * TRAIN_SAMPLES_PER_LIST / total)
+
+        sample = np.concatenate([
+            np.asarray(self._segment(key)[rng.random(count) < sample_rate]) for key, count in zip(keys, counts)
+        ])
+        centroids = train_centroids(sample, min(n_lists, len(sample)))
+
+        lists = np.concatenate([assign_lists(self._segment(key), centroids) for key in keys])
+        order = np.argsort(lists, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=len(centroids)))])
+
+        generation = str(time.time_ns())
+        index_dir = self._path("index", generation)
+        os.makedirs(index_dir, exist_ok=True)
+
+        destination = np.empty(total, dtype=np.int64)
+        destination[order] = np.arange(total)
+        vectors = np.lib.format.open_memmap(
+            os.path.join(index_dir, "vectors.npy"), mode="w+", dtype=np.float32,
+            shape=(total, centroids.shape[1])
+        )
+        position = 0
+        for key, count in zip(keys, counts):
+            vectors[destination[position:position + count]] = self._segment(key)
+            position += count
+        vectors.flush()
+        del vectors
+
+        doc_rows = np.repeat(np.arange(len(keys), dtype=np.int32), counts)
+        passage_ids = np.concatenate([np.arange(count, dtype=np.int32) for count in counts])
+        np.save(os.path.join(index_dir, "centroids.npy"), centroids)
+        np.save(os.path.join(index_dir, "offsets.npy"), offsets)
+        np.save(os.path.join(index_dir, "doc_rows.npy"), doc_rows[order])
+        np.save(os.path.join(index_dir, "passage_ids.npy"), passage_ids[order])
+
+        return {"generation": generation, "documents": keys, "counts": counts, "lists": len(centroids)}
+
+    def search(self, query, top_k=TOP_K_LIBRARY, n_probe=N_PROBE):
+        with self._lock:
+            self._refresh()
+            index = self._index
+            delta = self._delta_documents()
+
+        query = np.asarray(query, dtype=np.float32)
+        scores, doc_keys, passage_ids = [], [], []
+
+        if index is not None:
+            probe = _top_k(index["centroids"] @ query, n_probe)
+            ranges = [(index["offsets"][i], index["offsets"][i + 1]) for i in probe]
+            rows = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+            if len(rows):
+                row_scores = np.concatenate([index["vectors"][start:stop] @ query for start, stop in ranges])
+                doc_rows = np.asarray(index["doc_rows"][rows])
+                live = index["alive"][doc_rows]
+                for i in _top_k(np.where(live, row_scores, -np.inf), top_k):
+                    if live[i]:
+                        scores.append(float(row_scores[i]))
+                        doc_keys.append(index["documents"][doc_rows[i]])
+                        passage_ids.append(int(index["passage_ids"][rows[i]]))
+
+        for key in delta:
+            try:
+                segment_scores = self._segment(key) @ query
+            except (OSError, ValueError):
+                continue
+            for i in _top_k(segment_scores, top_k):
+                scores.append(float(segment_scores[i]))
+                doc_keys.append(key)
+                passage_ids.append(int(i))
+
+        best = _top_k(np.array(scores, dtype=np.float32), top_k)
+        return [(doc_keys[i], passage_ids[i], scores[i]) for i in best]
+
+    def stats(self):
+        self._refresh()
+        return [
+            {"document": doc["name"], "passages": doc["passages"], "doc_key": key}
+            for key, doc in self.documents.items()
+        ]
+
+
+_default_library = None
+
+
+def get_library():
+    global _default_library
+    if _default_library is None:
+        _default_library = Library()
+    return _default_library
+
+
+def answer_from_library(question, library=None, top_k=TOP_K_LIBRARY):
+    library = library or get_library()
+    with timed("library.search", passages=library.passage_count()):
+        hits = library.search(encode_texts([question])[0], top_k)
+    if not hits:
+        return {"answer": "", "score": 0.0, "document": None, "passage": "", "page": None, "retrieval_score": 0.0}
+
+    contexts = []
+    for doc_key, passage_id, _ in hits:
+        stored = library.passages(doc_key) or {"passages": {passage_id: ""}, "pages": None}
+        contexts.append((stored["passages"][passage_id], stored["pages"][passage_id] if stored["pages"] else None))
+
+    with timed("library.read", pairs=len(hits)):
+        readings = infer("qa", [(question, passage) for passage, _ in contexts])
+    best = max(range(len(hits)), key=lambda i: readings[i]["score"])
+
+    doc_key, _, retrieval_score = hits[best]
+    return {
+        "answer": readings[best]["answer"],
+        "score": readings[best]["score"],
+        "document": library.documents.get(doc_key, {}).get("name", doc_key),
+        "passage": contexts[best][0],
+        "page": contexts[best][1],
+        "retrieval_score": retrieval_score,
+    }
+
+
+def ask_question_from_library(question, library=None):
+    result = answer_from_library(question, library)
+    if result["document"] is None:
+        return "The library is empty. Add documents to search across them."
+
+    source = f"{result['document']}, page {result['page']}" if result["page"] else result["document"]
+    return (
+        f"**Answer:** {result['answer']}\n\n"
+        f"**Confidence:** {round(result['score'] * 100, 2)}%\n\n"
+        f"**Based on:** _{result['passage']}_ ({source})"
+    )
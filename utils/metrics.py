@@ -0,0 +1,181 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+METRICS_SINKS = os.environ.get("NEUROSCHOLAR_METRICS_SINKS", "")
+PROMETHEUS_FILE = os.environ.get(
+    "NEUROSCHOLAR_METRICS_FILE", os.path.join(tempfile.gettempdir(), "neuroscholar_metrics.prom")
+)
+HISTORY_SIZE = int(os.environ.get("NEUROSCHOLAR_METRICS_HISTORY", 500))
+
+logger = logging.getLogger("neuroscholar.metrics")
+
+
+def resident_memory():
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss
+    except ImportError:
+        pass
+
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class LogSink:
+    def __init__(self, log=logger):
+        self.log = log
+
+    def emit(self, event, metrics):
+        sizes = " ".join(f"{key}={value}" for key, value in event["sizes"].items())
+        self.log.info(
+            "stage=%s seconds=%.4f memory_mb=%+.1f %s", event["stage"], event["seconds"], event["memory_mb"], sizes
+        )
+
+
+STAGE_FAMILIES = (
+    ("neuroscholar_stage_calls_total", "counter", "calls", "d"),
+    ("neuroscholar_stage_seconds_total", "counter", "seconds", ".6f"),
+    ("neuroscholar_stage_memory_growth_mb_total", "counter", "memory_growth_mb", ".3f"),
+    ("neuroscholar_stage_memory_mb", "gauge", "memory_mb", ".3f"),
+)
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PrometheusSink:
+    def __init__(self, path=PROMETHEUS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, event, metrics):
+        stages = sorted(metrics.totals().items())
+        lines = []
+        for metric, kind, key, fmt in STAGE_FAMILIES:
+            lines.append(f"# TYPE {metric} {kind}")
+            for stage, totals in stages:
+                lines.append(f'{metric}{{stage="{_label_value(stage)}"}} {totals[key]:{fmt}}')
+
+        lines.append("# TYPE neuroscholar_events_total counter")
+        for (name, labels), value in sorted(metrics.counters().items()):
+            label_text = ",".join(
+                [f'event="{_label_value(name)}"'] + [f'{key}="{_label_value(val)}"' for key, val in labels]
+            )
+            lines.append(f"neuroscholar_events_total{{{label_text}}} {value}")
+
+        with self._lock:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp, self.path)
+
+
+SINKS = {
+    "log": LogSink,
+    "prometheus": PrometheusSink,
+}
+
+
+def build_sinks(spec=METRICS_SINKS):
+    sinks = []
+    for name in filter(None, (part.strip() for part in spec.split(","))):
+        if name not in SINKS:
+            raise ValueError(f"Unknown metrics sink '{name}', expected one of {', '.join(SINKS)}")
+        sinks.append(SINKS[name]())
+    return sinks
+
+
+class Metrics:
+    def __init__(self, sinks=None, history=HISTORY_SIZE):
+        self.sinks = list(sinks or [])
+        self._events = deque(maxlen=history)
+        self._totals = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "memory_growth_mb": 0.0, "memory_mb": 0.0})
+        self._counters = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, memory_mb=0.0, **sizes):
+        event = {"stage": stage, "time": time.time(), "seconds": seconds, "memory_mb": memory_mb, "sizes": sizes}
+        with self._lock:
+            self._events.append(event)
+            totals = self._totals[stage]
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["memory_growth_mb"] += max(memory_mb, 0.0)
+            totals["memory_mb"] = memory_mb
+
+        for sink in self.sinks:
+            try:
+                sink.emit(event, self)
+            except Exception:
+                logger.exception("Metrics sink %s failed", type(sink).__name__)
+
+    def count(self, name, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += 1
+
+    def events(self, stage=None):
+        with self._lock:
+            return [event for event in self._events if stage is None or event["stage"] == stage]
+
+    def totals(self):
+        with self._lock:
+            return {stage: dict(totals) for stage, totals in self._totals.items()}
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def summary(self):
+        recent = defaultdict(list)
+        for event in self.events():
+            recent[event["stage"]].append(event)
+
+        rows = []
+        for stage, totals in sorted(self.totals().items()):
+            events = recent.get(stage, [])
+            seconds = np.array([event["seconds"] for event in events]) if events else np.zeros(1)
+            rows.append({
+                "stage": stage,
+                "calls": totals["calls"],
+                "total_s": totals["seconds"],
+                "p50_ms": float(np.percentile(seconds, 50) * 1000),
+                "p90_ms": float(np.percentile(seconds, 90) * 1000),
+                "memory_mb": events[-1]["memory_mb"] if events else 0.0,
+                "last_sizes": ", ".join(f"{k}={v}" for k, v in events[-1]["sizes"].items()) if events else "",
+            })
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+
+metrics = Metrics(build_sinks())
+
+
+@contextmanager
+def timed(stage, **sizes):
+    rss_before = resident_memory()
+    started = time.perf_counter()
+    try:
+        yield sizes
+    finally:
+        seconds = time.perf_counter() - started
+        metrics.record(stage, seconds, (resident_memory() - rss_before) / 2 ** 20, **sizes)
+
+
+def count(name, **labels):
+    metrics.count(name, **labels)
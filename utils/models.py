@@ -0,0 +1,307 @@
+import argparse
+import os
+import threading
+import time
+
+from utils.metrics import resident_memory as _resident_memory, count
+
+MODEL_SPECS = {
+    "summarizer": {"task": "summarization", "model": "facebook/bart-large-cnn"},
+    "qa": {"task": "question-answering", "model": "distilbert-base-cased-distilled-squad"},
+    "text_gen": {"task": "text-generation", "model": "gpt2"},
+    "semantic": {"task": "sentence-embedding", "model": "all-MiniLM-L6-v2"},
+}
+
+BACKENDS = ("torch", "int8", "onnx")
+DEFAULT_BACKEND = os.environ.get("NEUROSCHOLAR_MODEL_BACKEND", "torch")
+MODEL_ADMIN = os.environ.get("NEUROSCHOLAR_MODEL_ADMIN", "0") != "0"
+STREAM_TIMEOUT = float(os.environ.get("NEUROSCHOLAR_STREAM_TIMEOUT", 120))
+
+ORT_MODEL_CLASSES = {
+    "summarization": "ORTModelForSeq2SeqLM",
+    "question-answering": "ORTModelForQuestionAnswering",
+    "text-generation": "ORTModelForCausalLM",
+}
+
+PARITY_SAMPLES = {
+    "semantic": [
+        "Transformers use self-attention to model long-range dependencies.",
+        "The proposed method improves accuracy by 12% over the baseline.",
+    ],
+    "qa": [
+        ("What do transformers use?", "Transformers use self-attention to model long-range dependencies."),
+        ("How much does accuracy improve?", "The proposed method improves accuracy by 12% over the baseline."),
+    ],
+    "summarizer": [
+        "We study retrieval-augmented question answering over long scientific documents. "
+        "Passages are ranked with BM25 and dense embeddings before a reader extracts the answer span. "
+        "Experiments on three benchmarks show that latency stays constant as documents grow, "
+        "while accuracy matches reading the full document."
+    ],
+    "text_gen": ["The main contribution of this paper is"],
+}
+
+PARITY_KWARGS = {
+    "semantic": {"convert_to_numpy": True, "normalize_embeddings": True},
+    "qa": {},
+    "summarizer": {"max_length": 60, "min_length": 10, "do_sample": False},
+    "text_gen": {"max_new_tokens": 20, "do_sample": False},
+}
+
+
+def backend_for(name):
+    return os.environ.get(f"NEUROSCHOLAR_BACKEND_{name.upper()}", DEFAULT_BACKEND)
+
+
+def _quantize(module):
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+    return quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _build_model(spec):
+    backend = spec.get("backend", "torch")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}', expected one of {', '.join(BACKENDS)}")
+
+    if spec["task"] == "sentence-embedding":
+        from sentence_transformers import SentenceTransformer
+        if backend == "onnx":
+            return SentenceTransformer(spec["model"], revision=spec.get("revision"), backend="onnx")
+
+        model = SentenceTransformer(spec["model"], revision=spec.get("revision"))
+        return _quantize(model) if backend == "int8" else model
+
+    from transformers import pipeline
+    if backend == "onnx":
+        import optimum.onnxruntime
+        from transformers import AutoTokenizer
+
+        model_class = getattr(optimum.onnxruntime, ORT_MODEL_CLASSES[spec["task"]])
+        model = model_class.from_pretrained(spec["model"], revision=spec.get("revision"), export=True)
+        tokenizer = AutoTokenizer.from_pretrained(spec["model"], revision=spec.get("revision"))
+        return pipeline(spec["task"], model=model, tokenizer=tokenizer)
+
+    pipe = pipeline(spec["task"], model=spec["model"], tokenizer=spec["model"], revision=spec.get("revision"))
+    if backend == "int8":
+        pipe.model = _quantize(pipe.model)
+    return pipe
+
+
+class ModelRegistry:
+    def __init__(self, specs=None):
+        self.specs = {
+            name: {**spec, "backend": spec.get("backend") or backend_for(name)}
+            for name, spec in (specs or MODEL_SPECS).items()
+        }
+        self._models = {}
+        self._stats = {}
+        self._locks = {name: threading.Lock() for name in self.specs}
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            count("model_cache", model=name, result="hit")
+            return model
+
+        with self._locks[name]:
+            if name not in self._models:
+                count("model_cache", model=name, result="miss")
+                self._load(name)
+            return self._models[name]
+
+    def _load(self, name):
+        spec = self.specs[name]
+        rss_before = _resident_memory()
+        started = time.perf_counter()
+
+        self._models[name] = _build_model(spec)
+
+        self._stats[name] = {
+            "model": spec["model"],
+            "backend": spec["backend"],
+            "load_seconds": time.perf_counter() - started,
+            "memory_mb": max(_resident_memory() - rss_before, 0) / 2 ** 20,
+        }
+
+    def tag(self, name):
+        spec = self.specs[name]
+        tag = f"{spec['model']}@{spec.get('revision') or 'main'}"
+        return tag if spec["backend"] == "torch" else f"{tag}+{spec['backend']}"
+
+    def set_backend(self, name, backend):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown model backend '{backend}', expected one of {', '.join(BACKENDS)}")
+        if self.specs[name]["backend"] != backend:
+            self.unload([name])
+            self.specs[name] = {**self.specs[name], "backend": backend}
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warm_up(self, names=None):
+        for name in names or self.specs:
+            self.get(name)
+
+    def unload(self, names=None):
+        for name in names or list(self._models):
+            if name not in self._locks:
+                continue
+            with self._locks[name]:
+                self._models.pop(name, None)
+                self._stats.pop(name, None)
+
+        import gc
+        gc.collect()
+
+    def stats(self):
+        return [
+            {
+                "name": name,
+                "loaded": self.is_loaded(name),
+                **self._stats.get(name, {"model": spec["model"], "backend": spec["backend"]})
+            }
+            for name, spec in self.specs.items()
+        ]
+
+
+registry = ModelRegistry()
+
+
+def get_model(name):
+    return registry.get(name)
+
+
+def warm_up(names=None):
+    registry.warm_up(names)
+
+
+def unload(names=None):
+    registry.unload(names)
+
+
+def _stop_when_set(event):
+    import torch
+    from transformers import StoppingCriteria
+
+    class StopWhenSet(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+    return StopWhenSet()
+
+
+def stream_generate(name, prompt, max_input_tokens=None, timeout=STREAM_TIMEOUT, **generate_kwargs):
+    from transformers import StoppingCriteriaList, TextIteratorStreamer
+
+    pipe = get_model(name)
+    inputs = pipe.tokenizer(
+        prompt,
+        return_tensors="pt",
+        truncation=max_input_tokens is not None,
+        max_length=max_input_tokens
+    )
+    streamer = TextIteratorStreamer(pipe.tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=timeout)
+    stop = threading.Event()
+    errors = []
+
+    generate_kwargs.setdefault("pad_token_id", pipe.tokenizer.pad_token_id or pipe.tokenizer.eos_token_id)
+    generate_kwargs["stopping_criteria"] = StoppingCriteriaList([_stop_when_set(stop)])
+
+    def generate():
+        try:
+            pipe.model.generate(**inputs, streamer=streamer, **generate_kwargs)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            streamer.end()
+
+    threading.Thread(target=generate, daemon=True).start()
+    try:
+        for text in streamer:
+            if text:
+                yield text
+    finally:
+        stop.set()
+    if errors:
+        raise errors[0]
+
+
+def model_tag(name):
+    return registry.tag(name)
+
+
+def set_backend(name, backend):
+    registry.set_backend(name, backend)
+
+
+def model_stats():
+    return registry.stats()
+
+
+def _agreement(name, reference, candidate):
+    import numpy as np
+
+    if name == "semantic":
+        return float(np.mean([np.dot(a, b) for a, b in zip(reference, candidate)]))
+    if name == "qa":
+        return float(np.mean([a["answer"] == b["answer"] for a, b in zip(reference, candidate)]))
+
+    def text(output):
+        output = output[0] if isinstance(output, list) else output
+        return output.get("summary_text") or output.get("generated_text", "")
+
+    overlaps = []
+    for a, b in zip(reference, candidate):
+        tokens_a, tokens_b = set(text(a).split()), set(text(b).split())
+        overlaps.append(len(tokens_a & tokens_b) / max(len(tokens_a | tokens_b), 1))
+    return float(np.mean(overlaps))
+
+
+def compare_backends(name, backend, baseline="torch", samples=None, repeats=3):
+    from utils.inference import call_model
+
+    samples = samples or PARITY_SAMPLES[name]
+    kwargs = PARITY_KWARGS[name]
+    spec = registry.specs[name]
+
+    results, loaded = {}, []
+    for label in (baseline, backend):
+        rss_before = _resident_memory()
+        model = _build_model({**spec, "backend": label})
+        memory_mb = max(_resident_memory() - rss_before, 0) / 2 ** 20
+
+        outputs = call_model(name, model, samples, **kwargs)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            call_model(name, model, samples, **kwargs)
+        results[label] = (outputs, (time.perf_counter() - started) / repeats, memory_mb)
+        loaded.append(model)
+
+    (reference, baseline_seconds, baseline_mb), (candidate, backend_seconds, backend_mb) = results[baseline], results[backend]
+    return {
+        "model": name,
+        "backend": backend,
+        "agreement": _agreement(name, reference, candidate),
+        "baseline_seconds": baseline_seconds,
+        "backend_seconds": backend_seconds,
+        "speedup": baseline_seconds / max(backend_seconds, 1e-9),
+        "baseline_memory_mb": baseline_mb,
+        "backend_memory_mb": backend_mb,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check a model backend against the fp32 PyTorch baseline")
+    parser.add_argument("--backend", choices=BACKENDS[1:], required=True)
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_SPECS), default=list(MODEL_SPECS))
+    args = parser.parse_args()
+
+    for model_name in args.models:
+        report = compare_backends(model_name, args.backend)
+        print(
+            f"{model_name:<12} agreement {report['agreement']:.3f}  "
+            f"{report['baseline_seconds'] * 1000:8.1f}ms -> {report['backend_seconds'] * 1000:8.1f}ms "
+            f"({report['speedup']:.2f}x)  "
+            f"{report['baseline_memory_mb']:7.1f}MB -> {report['backend_memory_mb']:7.1f}MB"
+        )
@@ -1,8 +1,120 @@
-import fitz 
-
-def extract_text_from_pdf(file):
-    doc = fitz.open(stream=file.read(), filetype="pdf")
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
\ No newline at end of file
+import os
+import tempfile
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+
+from utils.metrics import timed
+
+PARALLEL_PAGE_THRESHOLD = 64
+PAGES_PER_TASK = 16
+TASKS_IN_FLIGHT_PER_WORKER = 2
+MAX_PAGES = int(os.environ.get("NEUROSCHOLAR_MAX_PAGES", 0))
+
+
+def _read_source(source):
+    if isinstance(source, (str, os.PathLike)):
+        return None
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    return source.read()
+
+
+def _open_pdf(source, data=None):
+    if data is None:
+        return fitz.open(source)
+    return fitz.open(stream=data, filetype="pdf")
+
+
+def _extract_page_range(path, start, stop):
+    with fitz.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def _iter_parallel(path, page_count, workers, progress=None):
+    ranges = deque((start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        done = 0
+        while ranges or in_flight:
+            while ranges and len(in_flight) < workers * TASKS_IN_FLIGHT_PER_WORKER:
+                in_flight.append(pool.submit(_extract_page_range, path, *ranges.popleft()))
+
+            pages = in_flight.popleft().result()
+            done += len(pages)
+            yield from pages
+            if progress:
+                progress(done, page_count)
+
+
+def _iter_pages(source, data, workers, max_pages, sizes, progress=None):
+    with _open_pdf(source, data) as doc:
+        sizes["total_pages"] = doc.page_count
+        page_count = min(doc.page_count, max_pages) if max_pages else doc.page_count
+        if workers <= 1 or page_count < PARALLEL_PAGE_THRESHOLD:
+            for i in range(page_count):
+                yield doc[i].get_text()
+                if progress:
+                    progress(i + 1, page_count)
+            return
+
+    if data is None:
+        yield from _iter_parallel(source, page_count, workers, progress)
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(data)
+    try:
+        yield from _iter_parallel(tmp.name, page_count, workers, progress)
+    finally:
+        os.remove(tmp.name)
+
+
+def extract_pages_from_pdf(source, workers=None, progress=None, max_pages=MAX_PAGES):
+    data = _read_source(source)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with timed("pdf.extract") as sizes:
+        pages = list(_iter_pages(source, data, workers, max_pages, sizes, progress))
+        sizes.update(pages=len(pages), chars=sum(len(page) for page in pages))
+    return pages
+
+
+def spool_document_from_pdf(source, write, workers=None, progress=None, max_pages=MAX_PAGES):
+    data = _read_source(source)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    offsets = []
+    position = 0
+    with timed("pdf.extract", streamed=True) as sizes:
+        for page in _iter_pages(source, data, workers, max_pages, sizes, progress):
+            offsets.append(position)
+            write(page)
+            position += len(page)
+        sizes.update(pages=len(offsets), chars=position)
+    return offsets, sizes["total_pages"]
+
+
+def join_pages(pages):
+    offsets = []
+    position = 0
+    for page in pages:
+        offsets.append(position)
+        position += len(page)
+    return "".join(pages), offsets
+
+
+def page_at(page_offsets, position):
+    return max(bisect_right(page_offsets, position), 1)
+
+
+def extract_document_from_pdf(file, workers=None, progress=None, max_pages=MAX_PAGES):
+    return join_pages(extract_pages_from_pdf(file, workers, progress, max_pages))
+
+
+def extract_text_from_pdf(file, workers=None, progress=None, max_pages=MAX_PAGES):
+    return "".join(extract_pages_from_pdf(file, workers, progress, max_pages))
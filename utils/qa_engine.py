@@ -1,42 +1,358 @@
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer, util
-import torch
+import hashlib
+import re
+import threading
+from collections import OrderedDict
 
-qa_pipeline = pipeline("question-answering", model="distilbert-base-cased-distilled-squad")
+from sklearn.feature_extraction.text import CountVectorizer
+import numpy as np
 
-semantic_model = SentenceTransformer("all-MiniLM-L6-v2")
+from utils.models import get_model, stream_generate, model_tag
+from utils.inference import infer
+from utils.metrics import timed, count
+from utils.pdf_reader import page_at
+from utils.segmenter import segment_document, sentence_texts, heading_at
 
-text_gen = pipeline("text-generation", model="gpt2", tokenizer="gpt2")
+MAX_CACHED_INDEXES = 4
+MAX_CACHED_ANSWERS = 64
+DUPLICATE_QUESTION_THRESHOLD = 0.92
 
-def ask_question_from_doc(question, context):
-    result = qa_pipeline(question=question, context=context)
+PASSAGE_WORDS = 180
+PASSAGE_OVERLAP = 60
+TOP_K_PASSAGES = 3
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_WEIGHT = 0.5
+ANSWER_SIMILARITY_THRESHOLD = 0.7
+QUESTION_MAX_NEW_TOKENS = 120
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+_document_indexes = OrderedDict()
+_answer_caches = OrderedDict()
+_caches_lock = threading.Lock()
+
+
+def answer_questions(questions, context, passage_index=None, top_k=TOP_K_PASSAGES, page_offsets=None,
+                     segments=None, query_embeddings=None):
+    if passage_index is None:
+        passage_index = get_passage_index(context)
+    query_embeddings = list(query_embeddings) if query_embeddings is not None else [None] * len(questions)
+    missing = [q for q, embedding in enumerate(query_embeddings) if embedding is None]
+    if missing and passage_index["passages"]:
+        for q, embedding in zip(missing, encode_texts([questions[q] for q in missing])):
+            query_embeddings[q] = embedding
+
+    with timed("qa.retrieve", questions=len(questions), passages=len(passage_index["passages"])):
+        rankings = [
+            retrieve_passages(passage_index, question, top_k, embedding)
+            for question, embedding in zip(questions, query_embeddings)
+        ]
+    pairs = [(q, passage_id) for q, ranked in enumerate(rankings) for passage_id, _ in ranked]
+
+    readings = []
+    if pairs:
+        with timed("qa.read", questions=len(questions), pairs=len(pairs)):
+            readings = infer("qa", [(questions[q], passage_index["passages"][passage_id]) for q, passage_id in pairs])
+
+    best = {}
+    for (q, passage_id), reading in zip(pairs, readings):
+        if q not in best or reading["score"] > best[q][1]["score"]:
+            best[q] = (passage_id, reading)
+
+    results = []
+    for q, ranked in enumerate(rankings):
+        if q not in best:
+            results.append({
+                "answer": "", "score": 0.0, "passage": "", "passage_id": None, "retrieval_score": 0.0,
+                "page": None, "section": None
+            })
+            continue
+
+        passage_id, reading = best[q]
+        position = int(passage_index["starts"][passage_id]) + reading.get("start", 0) if "starts" in passage_index else None
+        page = page_at(page_offsets, position) if page_offsets and position is not None else None
+        section = heading_at(segments, position) if segments is not None and position is not None else None
+
+        results.append({
+            "answer": reading["answer"],
+            "score": reading["score"],
+            "passage": passage_index["passages"][passage_id],
+            "passage_id": passage_id,
+            "retrieval_score": dict(ranked)[passage_id],
+            "page": page,
+            "section": section
+        })
+
+    return results
+
+
+def answer_question(question, context, passage_index=None, top_k=TOP_K_PASSAGES, page_offsets=None, segments=None,
+                    query_embedding=None):
+    return answer_questions(
+        [question], context, passage_index, top_k, page_offsets, segments, [query_embedding]
+    )[0]
+
+
+class AnswerCache:
+    def __init__(self, max_size=MAX_CACHED_ANSWERS, threshold=DUPLICATE_QUESTION_THRESHOLD):
+        self.max_size = max_size
+        self.threshold = threshold
+        self._answers = OrderedDict()
+        self._embeddings = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, question, embedding=None):
+        key = normalize_question(question)
+        with self._lock:
+            if key not in self._answers and embedding is not None:
+                key = self.nearest(embedding)
+            if key is None or key not in self._answers:
+                return None
+
+            self._answers.move_to_end(key)
+            self._embeddings.move_to_end(key)
+            return self._answers[key]
+
+    def nearest(self, embedding):
+        with self._lock:
+            if not self._embeddings:
+                return None
+
+            keys = list(self._embeddings)
+            scores = np.stack(list(self._embeddings.values())) @ embedding
+            best = int(np.argmax(scores))
+            return keys[best] if scores[best] >= self.threshold else None
+
+    def put(self, question, answer, embedding):
+        key = normalize_question(question)
+        with self._lock:
+            self._answers[key] = answer
+            self._embeddings[key] = np.asarray(embedding, dtype=np.float32)
+            self._answers.move_to_end(key)
+            self._embeddings.move_to_end(key)
+
+            while len(self._answers) > self.max_size:
+                self._answers.popitem(last=False)
+                self._embeddings.popitem(last=False)
+        return answer
+
+    def __len__(self):
+        with self._lock:
+            return len(self._answers)
+
+
+def clear_answer_caches():
+    with _caches_lock:
+        _answer_caches.clear()
+
+
+def normalize_question(question):
+    return _TRAILING_PUNCTUATION.sub("", " ".join(question.lower().split()))
+
+
+def get_answer_cache(context):
+    key = (_context_key(context), model_tag("qa"), model_tag("semantic"))
+    with _caches_lock:
+        cache = _answer_caches.get(key)
+        if cache is None:
+            cache = _answer_caches[key] = AnswerCache()
+        _answer_caches.move_to_end(key)
+        while len(_answer_caches) > MAX_CACHED_INDEXES:
+            _answer_caches.popitem(last=False)
+        return cache
+
+
+def ask_question_from_doc(question, context, sentence_index=None, passage_index=None, page_offsets=None,
+                          segments=None):
+    cache = get_answer_cache(context)
+    cached = cache.get(question)
+    if cached is not None:
+        count("answer_cache", result="hit")
+        return cached
+
+    embedding = _encode_query(question)
+    cached = cache.get(question, embedding)
+    if cached is not None:
+        count("answer_cache", result="near_duplicate")
+        return cached
+
+    count("answer_cache", result="miss")
+    result = answer_question(
+        question, context, passage_index, page_offsets=page_offsets, segments=segments, query_embedding=embedding
+    )
     answer = result["answer"]
     score = result["score"]
 
-    justification, justification_score = get_justification_snippet(answer, context)
+    justification, justification_score = get_justification_snippet(answer, context, sentence_index)
+    location = [f"page {result['page']}"] if result["page"] else []
+    if result["section"]:
+        location.append(result["section"])
+    source = f" ({', '.join(location)})" if location else ""
 
-    return (
+    return cache.put(question, (
         f"**Answer:** {answer}\n\n"
         f"**Confidence:** {round(score * 100, 2)}%\n\n"
-        f"**Based on:** _{justification}_\n"
+        f"**Based on:** _{justification}_{source}\n"
         f"**Justification Score:** {round(justification_score * 100, 2)}%"
-    )
+    ), embedding)
+
+def split_sentences(text, segments=None):
+    if segments is None:
+        segments = segment_document(text)
+    return sentence_texts(text, segments)
+
+
+def encode_texts(texts):
+    if not texts:
+        dimension = get_model("semantic").get_sentence_embedding_dimension()
+        return np.zeros((0, dimension), dtype=np.float32)
+
+    embeddings = infer("semantic", texts, convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(np.stack(embeddings), dtype=np.float32)
+
+
+def build_sentence_index(context, segments=None):
+    sentences = split_sentences(context, segments)
+    with timed("qa.sentence_index", sentences=len(sentences)):
+        return {"sentences": sentences, "embeddings": encode_texts(sentences)}
+
+
+def chunk_passages(text, passage_words=PASSAGE_WORDS, overlap=PASSAGE_OVERLAP, segments=None):
+    if segments is None:
+        segments = segment_document(text)
+    words_before = np.concatenate([[0], np.cumsum(segments["words"], dtype=np.int64)])
+    n_sentences = len(segments["words"])
+
+    passages, starts = [], []
+    first = 0
+    while first < n_sentences:
+        stop = np.searchsorted(words_before, words_before[first] + passage_words, side="right") - 1
+        stop = min(max(stop, first + 1), n_sentences)
+        passages.append(text[segments["starts"][first]:segments["ends"][stop - 1]])
+        starts.append(int(segments["starts"][first]))
+        if stop == n_sentences:
+            break
+        first = max(int(np.searchsorted(words_before, words_before[stop] - overlap, side="left")), first + 1)
+    return passages, starts
+
+
+def build_bm25(passages):
+    vectorizer = CountVectorizer(stop_words="english")
+    try:
+        tf = vectorizer.fit_transform(passages).tocsc()
+    except ValueError:
+        return None
 
-def get_justification_snippet(answer, context):
-    sentences = context.split(".")
-    answer_emb = semantic_model.encode(answer, convert_to_tensor=True)
+    doc_len = np.asarray(tf.sum(axis=1)).ravel()
+    doc_freq = np.diff(tf.indptr)
+    n_docs = tf.shape[0]
+    return {
+        "vectorizer": vectorizer,
+        "tf": tf,
+        "idf": np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5)),
+        "length_norm": BM25_K1 * (1 - BM25_B + BM25_B * doc_len / max(doc_len.mean(), 1))
+    }
 
-    best_score = 0
-    best_sent = ""
 
-    for sent in sentences:
-        sent = sent.strip()
-        if sent:
-            sent_emb = semantic_model.encode(sent, convert_to_tensor=True)
-            score = util.pytorch_cos_sim(answer_emb, sent_emb).item()
-            if score > best_score:
-                best_score = score
-                best_sent = sent
+def bm25_scores(bm25, query):
+    term_ids = bm25["vectorizer"].transform([query]).indices
+    if len(term_ids) == 0:
+        return np.zeros(bm25["tf"].shape[0], dtype=np.float32)
+
+    tf = bm25["tf"][:, term_ids].toarray()
+    weights = tf * (BM25_K1 + 1) / (tf + bm25["length_norm"][:, None])
+    return (weights @ bm25["idf"][term_ids]).astype(np.float32)
+
+
+def build_passage_index(context, segments=None):
+    passages, starts = chunk_passages(context, segments=segments)
+    with timed("qa.passage_index", passages=len(passages)):
+        return {
+            "passages": passages,
+            "starts": np.asarray(starts, dtype=np.int64),
+            "embeddings": encode_texts(passages),
+            "bm25": build_bm25(passages) if passages else None
+        }
+
+
+def _context_key(context):
+    return hashlib.sha1(context.encode("utf-8")).hexdigest()
+
+
+def _get_cached_index(context, kind, builder):
+    key = (_context_key(context), kind)
+    with _caches_lock:
+        index = _document_indexes.get(key)
+        if index is not None:
+            _document_indexes.move_to_end(key)
+    if index is not None:
+        count("index_cache", kind=kind, result="hit")
+        return index
+
+    count("index_cache", kind=kind, result="miss")
+    index = builder(context)
+    with _caches_lock:
+        _document_indexes[key] = index
+        while len(_document_indexes) > MAX_CACHED_INDEXES * 2:
+            _document_indexes.popitem(last=False)
+    return index
+
+
+def get_sentence_index(context, segments=None):
+    return _get_cached_index(context, "sentences", lambda text: build_sentence_index(text, segments))
+
+
+def get_passage_index(context, segments=None):
+    return _get_cached_index(context, "passages", lambda text: build_passage_index(text, segments))
+
+
+def _top_k(scores, top_k):
+    k = min(top_k, len(scores))
+    if k == 0:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _encode_query(query):
+    return encode_texts([query])[0]
+
+
+def retrieve_passages(index, question, top_k=TOP_K_PASSAGES, query_embedding=None):
+    if not index["passages"]:
+        return []
+
+    if query_embedding is None:
+        query_embedding = _encode_query(question)
+    scores = index["embeddings"] @ query_embedding
+    if index["bm25"] is not None:
+        lexical = bm25_scores(index["bm25"], question)
+        if lexical.max() > 0:
+            scores = (1 - BM25_WEIGHT) * scores + BM25_WEIGHT * lexical / lexical.max()
+
+    return [(int(i), float(scores[i])) for i in _top_k(scores, top_k)]
+
+
+def search_sentence_index(index, query, top_k=3):
+    if not index["sentences"]:
+        return []
+
+    scores = index["embeddings"] @ _encode_query(query)
+    return [(index["sentences"][i], float(scores[i])) for i in _top_k(scores, top_k)]
+
+
+def get_justification_snippet(answer, context, index=None, top_k=3):
+    if index is None:
+        index = get_sentence_index(context)
+
+    with timed("qa.justification", sentences=len(index["sentences"])):
+        matches = [(sent, score) for sent, score in search_sentence_index(index, answer, top_k) if score > 0]
+
+    best_sent, best_score = matches[0] if matches else ("", 0)
+    for sent, score in matches:
+        if answer.lower() in sent.lower():
+            best_sent, best_score = sent, score
+            break
 
     if answer.lower() in best_sent.lower():
         start = best_sent.lower().find(answer.lower())
@@ -48,45 +364,90 @@ def get_justification_snippet(answer, context):
     return highlighted, best_score
 
 
-def generate_logic_questions(document_text):
+def _question_prompt(document_text):
     trimmed_text = document_text[:1000] if len(document_text) > 1000 else document_text
 
-    prompt = (
+    return (
         "Generate 3 logic-based and comprehension questions based on the following academic text:\n\n"
         f"{trimmed_text}\n\n"
         "Questions:\n1."
     )
 
+
+def parse_questions(generated_text):
+    raw = generated_text.split("Questions:")[-1]
+    lines = raw.strip().split("\n")
+
+    questions = []
+    for line in lines:
+        line = line.strip()
+        if line and (line[0].isdigit() or line.startswith("-")):
+            questions.append(line.lstrip("1234567890.- ").strip())
+        if len(questions) == 3:
+            break
+
+    return questions if questions else ["Unable to generate questions."]
+
+
+def generate_logic_questions(document_text):
+    prompt = _question_prompt(document_text)
+
     try:
-        result = text_gen(prompt, max_length=300, do_sample=True, top_k=50, temperature=0.8)
-        raw = result[0]['generated_text'].split("Questions:")[-1]
-        lines = raw.strip().split("\n")
-
-        questions = []
-        for line in lines:
-            line = line.strip()
-            if line and (line[0].isdigit() or line.startswith("-")):
-                questions.append(line.lstrip("1234567890.- ").strip())
-            if len(questions) == 3:
-                break
-
-        return questions if questions else ["Unable to generate questions."]
+        with timed("qa.generate_questions", prompt_chars=len(prompt)):
+            result = infer(
+                "text_gen", [prompt], max_new_tokens=QUESTION_MAX_NEW_TOKENS, do_sample=True, top_k=50, temperature=0.8
+            )[0]
+        return parse_questions(result[0]['generated_text'])
     
     except Exception as e:
         print("Error in question generation:", str(e))
         return ["Failed to generate questions."]
 
-def evaluate_user_answer(document_text, question, user_answer):
-    expected_answer = qa_pipeline(question=question, context=document_text)["answer"]
 
-    embedding1 = semantic_model.encode(expected_answer, convert_to_tensor=True)
-    embedding2 = semantic_model.encode(user_answer, convert_to_tensor=True)
-    similarity = util.pytorch_cos_sim(embedding1, embedding2).item()
+def stream_logic_questions(document_text):
+    yield "1."
+    try:
+        yield from stream_generate(
+            "text_gen",
+            _question_prompt(document_text),
+            max_new_tokens=QUESTION_MAX_NEW_TOKENS,
+            do_sample=True,
+            top_k=50,
+            temperature=0.8
+        )
+    except Exception as e:
+        print("Error in question generation:", str(e))
+
 
-    if similarity > 0.7:
+def answer_feedback(expected_answer, similarity):
+    if similarity > ANSWER_SIMILARITY_THRESHOLD:
         return "✅ Correct! Your answer aligns well with the document."
     else:
         return (
             f"❌ Not quite. Expected something like: '{expected_answer}'. "
             "Consider reviewing that section again."
         )
+
+
+def evaluate_user_answers(document_text, responses, passage_index=None):
+    questions = [question for question, _ in responses]
+    expected = [result["answer"] for result in answer_questions(questions, document_text, passage_index)]
+
+    with timed("qa.evaluate", answers=len(responses)):
+        embeddings = encode_texts(expected + [answer for _, answer in responses])
+        similarities = np.einsum("ij,ij->i", embeddings[:len(expected)], embeddings[len(expected):])
+
+    return [
+        {
+            "question": question,
+            "expected_answer": expected_answer,
+            "similarity": float(similarity),
+            "correct": bool(similarity > ANSWER_SIMILARITY_THRESHOLD),
+            "feedback": answer_feedback(expected_answer, similarity)
+        }
+        for question, expected_answer, similarity in zip(questions, expected, similarities)
+    ]
+
+
+def evaluate_user_answer(document_text, question, user_answer, passage_index=None):
+    return evaluate_user_answers(document_text, [(question, user_answer)], passage_index)[0]["feedback"]
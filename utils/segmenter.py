@@ -0,0 +1,107 @@
+import re
+
+import numpy as np
+
+SEGMENTATION_VERSION = 2
+MAX_SENTENCE_WORDS = 120
+MAX_UNDOTTED_HEADING_WORDS = 6
+
+ABBREVIATIONS = frozenset({
+    "al", "approx", "cf", "ch", "dr", "e.g", "eq", "eqs", "esp", "etc", "fig", "figs", "i.e", "inc", "jr",
+    "ltd", "mr", "mrs", "ms", "no", "nos", "p", "pp", "prof", "ref", "refs", "resp", "sec", "secs", "sr",
+    "st", "tab", "vol", "vs", "viz"
+})
+
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*(?=\s)")
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+_HEADING = re.compile(
+    r"^[ \t]*(?:(?:\d+(?:\.\d+)+\.?|\d+\.|[IVX]+\.)[ \t]+[A-Z][^\n.]{0,80}|"
+    rf"\d{{1,2}}[ \t]+[A-Z][^\s.!?]*(?:[ \t]+[^\s.!?]+){{0,{MAX_UNDOTTED_HEADING_WORDS - 1}}}(?<![,;:\-])|"
+    r"(?i:abstract|introduction|related work|background|methods?|methodology|experiments?|results|"
+    r"discussion|conclusions?|references|acknowledge?ments?|appendix))[ \t]*$",
+    re.MULTILINE
+)
+_WORD = re.compile(r"\S+")
+
+
+def _is_abbreviation(text, position):
+    start = position
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+    word = text[start:position].lower().lstrip("([\"'")
+    return word in ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+
+def _cuts(text, headings):
+    cuts = {0, len(text)}
+    for match in _SENTENCE_END.finditer(text):
+        following = match.end()
+        while following < len(text) and text[following].isspace():
+            following += 1
+        if following < len(text) and text[following].islower():
+            continue
+        if text[match.start()] == "." and match.end() - match.start() == 1 and _is_abbreviation(text, match.start()):
+            continue
+        cuts.add(match.end())
+
+    cuts.update(match.start() for match in _PARAGRAPH_BREAK.finditer(text))
+    for start, end in headings:
+        cuts.update((start, end))
+    return sorted(cuts)
+
+
+def _spans(text, cuts, max_words):
+    for start, end in zip(cuts, cuts[1:]):
+        words = [match.span() for match in _WORD.finditer(text, start, end)]
+        for first in range(0, len(words), max_words):
+            window = words[first:first + max_words]
+            yield window[0][0], window[-1][1], len(window)
+
+
+def segment_document(text, page_offsets=None, max_words=MAX_SENTENCE_WORDS):
+    headings = [(match.start(), match.end()) for match in _HEADING.finditer(text)]
+    spans = list(_spans(text, _cuts(text, headings), max_words))
+
+    starts = np.array([start for start, _, _ in spans], dtype=np.int64)
+    breaks = np.array([match.start() for match in _PARAGRAPH_BREAK.finditer(text)], dtype=np.int64)
+    segments = {
+        "starts": starts,
+        "ends": np.array([end for _, end, _ in spans], dtype=np.int64),
+        "words": np.array([words for _, _, words in spans], dtype=np.int32),
+        "paragraphs": np.searchsorted(breaks, starts).astype(np.int32),
+        "heading_starts": np.array([start for start, _ in headings], dtype=np.int64),
+        "headings": [text[start:end].strip() for start, end in headings],
+        "token_counts": {},
+    }
+    if page_offsets:
+        segments["pages"] = np.maximum(
+            np.searchsorted(np.asarray(page_offsets), starts, side="right"), 1
+        ).astype(np.int32)
+    return segments
+
+
+def sentence_texts(text, segments):
+    return [text[start:end] for start, end in zip(segments["starts"], segments["ends"])]
+
+
+def paragraph_texts(text, segments):
+    paragraphs = segments["paragraphs"]
+    if len(paragraphs) == 0:
+        return []
+    firsts = np.flatnonzero(np.diff(paragraphs, prepend=-1))
+    lasts = np.append(firsts[1:] - 1, len(paragraphs) - 1)
+    return [text[segments["starts"][first]:segments["ends"][last]] for first, last in zip(firsts, lasts)]
+
+
+def token_counts(text, segments, tokenizer):
+    name = getattr(tokenizer, "name_or_path", None) or type(tokenizer).__name__
+    if name not in segments["token_counts"]:
+        sentences = sentence_texts(text, segments)
+        ids = tokenizer(sentences, add_special_tokens=False)["input_ids"] if sentences else []
+        segments["token_counts"][name] = np.array([len(sentence_ids) for sentence_ids in ids], dtype=np.int32)
+    return segments["token_counts"][name]
+
+
+def heading_at(segments, position):
+    i = np.searchsorted(segments["heading_starts"], position, side="right") - 1
+    return segments["headings"][i] if i >= 0 else None
@@ -0,0 +1,123 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.metrics import count
+
+SESSION_MAX_BYTES = int(float(os.environ.get("NEUROSCHOLAR_SESSION_MAX_MB", 256)) * 2 ** 20)
+TOTAL_MAX_BYTES = int(float(os.environ.get("NEUROSCHOLAR_SESSIONS_MAX_MB", 1024)) * 2 ** 20)
+IDLE_SECONDS = float(os.environ.get("NEUROSCHOLAR_SESSION_IDLE_SECONDS", 1800))
+
+
+def footprint(value, seen=None):
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, np.memmap):
+        return 0
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(footprint(k, seen) + footprint(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(footprint(item, seen) for item in value)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + footprint(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+class SessionStore:
+    def __init__(self, max_session_bytes=SESSION_MAX_BYTES, max_total_bytes=TOTAL_MAX_BYTES,
+                 idle_seconds=IDLE_SECONDS):
+        self.max_session_bytes = max_session_bytes
+        self.max_total_bytes = max_total_bytes
+        self.idle_seconds = idle_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _session(self, session_id):
+        session = self._sessions.setdefault(session_id, {"touched": 0.0, "artifacts": OrderedDict()})
+        session["touched"] = time.time()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def get(self, session_id, name, load):
+        with self._lock:
+            artifacts = self._session(session_id)["artifacts"]
+            if name in artifacts:
+                artifacts.move_to_end(name)
+                count("session_store", result="hit")
+                return artifacts[name][0]
+
+        count("session_store", result="miss")
+        value = load()
+        if value is None:
+            return None
+        nbytes = footprint(value)
+        if nbytes > self.max_session_bytes:
+            count("session_store", result="oversized")
+            return value
+
+        with self._lock:
+            self._session(session_id)["artifacts"][name] = (value, nbytes)
+            self._enforce(session_id)
+        return value
+
+    def _enforce(self, session_id):
+        now = time.time()
+        for other_id, session in list(self._sessions.items()):
+            if other_id != session_id and now - session["touched"] > self.idle_seconds:
+                self._evict(other_id)
+
+        artifacts = self._sessions[session_id]["artifacts"]
+        while len(artifacts) > 1 and self._bytes(session_id) > self.max_session_bytes:
+            artifacts.popitem(last=False)
+            count("session_store", result="evicted")
+
+        for other_id in list(self._sessions):
+            if self.total_bytes() <= self.max_total_bytes:
+                break
+            if other_id != session_id:
+                self._evict(other_id)
+
+    def _evict(self, session_id):
+        session = self._sessions.pop(session_id)
+        for _ in session["artifacts"]:
+            count("session_store", result="evicted")
+
+    def _bytes(self, session_id):
+        return sum(nbytes for _, nbytes in self._sessions[session_id]["artifacts"].values())
+
+    def drop(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def total_bytes(self):
+        return sum(self._bytes(session_id) for session_id in self._sessions)
+
+    def usage(self):
+        with self._lock:
+            now = time.time()
+            return [{
+                "session": session_id[:8],
+                "artifacts": len(session["artifacts"]),
+                "memory_mb": self._bytes(session_id) / 2 ** 20,
+                "idle_s": now - session["touched"],
+            } for session_id, session in reversed(self._sessions.items())]
+
+
+_default_store = None
+
+
+def get_session_store():
+    global _default_store
+    if _default_store is None:
+        _default_store = SessionStore()
+    return _default_store
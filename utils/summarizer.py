@@ -1,20 +1,149 @@
-from transformers import pipeline
+from contextlib import closing
 
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+import numpy as np
 
-def summarize_text(text, max_words=150):
-    if len(text.split()) > 600:
-        text = " ".join(text.split()[:600])
+from utils.models import get_model, stream_generate
+from utils.inference import infer
+from utils.metrics import timed
+from utils.segmenter import segment_document, sentence_texts, token_counts
 
-    summary = summarizer(
-        text,
-        max_length=200,
-        min_length=50,
-        do_sample=False
-    )[0]['summary_text']
+MAX_INPUT_TOKENS = 1024
+TOKEN_MARGIN = 16
+MAX_CHUNKS = 32
+MAX_DEPTH = 2
+CHUNK_SUMMARY_MAX_TOKENS = 120
+CHUNK_SUMMARY_MIN_TOKENS = 30
+SUMMARY_MAX_TOKENS = 200
+SUMMARY_MIN_TOKENS = 50
+SUMMARY_DECODING = {
+    "beam": {"do_sample": False},
+    "greedy": {"num_beams": 1, "do_sample": False},
+}
 
-    words = summary.split()
-    if len(words) > max_words:
-        summary = " ".join(words[:max_words]) + "..."
 
-    return summary
\ No newline at end of file
+def chunk_by_tokens(text, tokenizer, max_tokens=None, segments=None):
+    if max_tokens is None:
+        max_tokens = min(tokenizer.model_max_length, MAX_INPUT_TOKENS) - TOKEN_MARGIN
+
+    if segments is None:
+        segments = segment_document(text)
+    sentences = sentence_texts(text, segments)
+    if not sentences:
+        return []
+
+    with timed("summarizer.tokenize", sentences=len(sentences)) as sizes:
+        lengths = token_counts(text, segments, tokenizer)
+        sizes["tokens"] = int(lengths.sum())
+
+    chunks, current, current_tokens = [], [], 0
+    for sent, n_tokens in zip(sentences, lengths):
+        if n_tokens > max_tokens:
+            if current:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            ids = tokenizer(sent, add_special_tokens=False)["input_ids"]
+            for start in range(0, len(ids), max_tokens):
+                chunks.append(tokenizer.decode(ids[start:start + max_tokens]))
+            continue
+
+        if current_tokens + n_tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(sent)
+        current_tokens += n_tokens
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def select_chunks(chunks, max_chunks=MAX_CHUNKS):
+    if len(chunks) <= max_chunks:
+        return chunks
+    keep = np.linspace(0, len(chunks) - 1, max_chunks).round().astype(int)
+    return [chunks[i] for i in keep]
+
+
+def reduce_text(text, max_depth=MAX_DEPTH, max_chunks=MAX_CHUNKS, segments=None):
+    tokenizer = get_model("summarizer").tokenizer
+
+    for depth in range(max_depth):
+        chunks = chunk_by_tokens(text, tokenizer, segments=segments if depth == 0 else None)
+        if len(chunks) <= 1:
+            break
+
+        selected = select_chunks(chunks, max_chunks)
+        with timed("summarizer.reduce", depth=depth, chunks=len(chunks), summarized=len(selected)):
+            partials = infer(
+                "summarizer",
+                selected,
+                max_length=CHUNK_SUMMARY_MAX_TOKENS,
+                min_length=CHUNK_SUMMARY_MIN_TOKENS,
+                do_sample=False,
+                truncation=True
+            )
+        text = " ".join(partial['summary_text'] for partial in partials)
+
+    return text
+
+
+def summarize_texts(texts, max_words=150, hierarchical=True, max_depth=MAX_DEPTH, max_chunks=MAX_CHUNKS,
+                    segments=None):
+    inputs = []
+    for text, text_segments in zip(texts, segments or [None] * len(texts)):
+        if hierarchical:
+            text = reduce_text(text, max_depth, max_chunks, text_segments)
+        elif len(text.split()) > 600:
+            text = " ".join(text.split()[:600])
+        inputs.append(text)
+
+    with timed("summarizer.summarize", documents=len(inputs), words=sum(len(text.split()) for text in inputs)):
+        results = infer(
+            "summarizer",
+            inputs,
+            max_length=SUMMARY_MAX_TOKENS,
+            min_length=SUMMARY_MIN_TOKENS,
+            truncation=True,
+            **SUMMARY_DECODING["beam"]
+        )
+
+    summaries = []
+    for result in results:
+        summary = result['summary_text']
+        words = summary.split()
+        if len(words) > max_words:
+            summary = " ".join(words[:max_words]) + "..."
+        summaries.append(summary)
+
+    return summaries
+
+
+def summarize_text(text, max_words=150, hierarchical=True, max_depth=MAX_DEPTH, max_chunks=MAX_CHUNKS,
+                   segments=None):
+    return summarize_texts([text], max_words, hierarchical, max_depth, max_chunks, [segments])[0]
+
+
+def stream_summary(text, max_words=150, max_depth=MAX_DEPTH, max_chunks=MAX_CHUNKS, segments=None):
+    text = reduce_text(text, max_depth, max_chunks, segments)
+
+    words = 0
+    with timed("summarizer.stream", words=len(text.split())) as sizes:
+        pieces = stream_generate(
+            "summarizer",
+            text,
+            max_input_tokens=MAX_INPUT_TOKENS,
+            max_length=SUMMARY_MAX_TOKENS,
+            min_length=SUMMARY_MIN_TOKENS,
+            **SUMMARY_DECODING["greedy"]
+        )
+        with closing(pieces):
+            for piece in pieces:
+                piece_words = piece.split()
+                if words + len(piece_words) > max_words:
+                    lead = " " if piece[:1].isspace() else ""
+                    sizes["summary_words"] = max_words
+                    yield lead + " ".join(piece_words[:max_words - words]) + "..."
+                    return
+                words += len(piece_words)
+                sizes["summary_words"] = words
+                yield piece